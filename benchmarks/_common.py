@@ -0,0 +1,67 @@
+import asyncio
+import os
+import statistics
+import time
+
+
+def setup_django(flush=False):
+    """Настраивает Django для бенчмарка и применяет миграции.
+
+    flush=True очищает БД, но только выделенную для замеров: со словом bench
+    в имени (как SQLite из benchmarks/settings.py) или при BENCH_FLUSH=True.
+    """
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "benchmarks.settings")
+
+    import django
+
+    django.setup()
+
+    from django.core.management import call_command
+    from django.db import connection
+
+    name = os.path.basename(str(connection.settings_dict["NAME"]))
+    if flush and "bench" not in name and os.getenv("BENCH_FLUSH", "False") != "True":
+        raise SystemExit(
+            f"БД {name} не выделена для замеров, бенчмарк ее не очищает. "
+            "Создайте БД со словом bench в имени или задайте BENCH_FLUSH=True."
+        )
+
+    call_command("migrate", verbosity=0)
+    if flush:
+        call_command("flush", interactive=False, verbosity=0)
+
+
+def report(title, timings):
+    """Печатает сводку по списку длительностей в секундах"""
+    total = sum(timings)
+    ordered = sorted(timings)
+    print(
+        f"{title}: {len(timings)} запросов, {len(timings) / total:.1f} req/s, "
+        f"p50={statistics.median(ordered) * 1000:.2f} ms, "
+        f"max={ordered[-1] * 1000:.2f} ms"
+    )
+
+
+def summarize(timings, elapsed):
+    """Сводка для файла результатов: req/s и перцентили длительностей в мс"""
+    cuts = statistics.quantiles(timings, n=100, method="inclusive")
+    return {
+        "requests": len(timings),
+        "rps": round(len(timings) / elapsed, 1),
+        "p50_ms": round(cuts[49] * 1000, 2),
+        "p95_ms": round(cuts[94] * 1000, 2),
+        "p99_ms": round(cuts[98] * 1000, 2),
+        "max_ms": round(max(timings) * 1000, 2),
+    }
+
+
+class SlowSMSBackend:
+    """Шлюз, имитирующий задержку реального SMS-провайдера"""
+
+    latency = 2.0
+
+    def send(self, phone, message):
+        time.sleep(self.latency)
+
+    async def asend(self, phone, message):
+        await asyncio.sleep(self.latency)
@@ -0,0 +1,117 @@
+"""Нагрузочный тест: синхронный WSGI-путь против асинхронного ASGI-пути входа.
+
+Оба пути отправляют SMS в обработчике запроса через медленный шлюз. Синхронный
+путь ограничен числом рабочих потоков WSGI (--workers), асинхронный держит все
+запросы одновременно в одном цикле событий.
+
+    python -m benchmarks.async_login --requests 200 --latency 1 --workers 4
+"""
+
+import argparse
+import asyncio
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._common import SlowSMSBackend, setup_django
+
+SETTINGS = {
+    "SMS_BACKEND": "benchmarks._common.SlowSMSBackend",
+    "SMS_DISPATCHER": "users.delivery.SyncDispatcher",
+}
+
+
+def login_flow_sync(client, phone):
+    from users.models import AuthCode
+
+    response = client.post("/api/users/login/", {"phone": phone})
+    assert response.status_code in (200, 201), response.content
+    code = AuthCode.objects.filter(user__phone=phone).values_list("code", flat=True)
+    response = client.put(
+        "/api/users/login/",
+        {"phone": phone, "auth_code": code.last()},
+        content_type="application/json",
+    )
+    assert response.status_code == 200, response.content
+
+
+async def login_flow_async(client, phone):
+    from users.models import AuthCode
+
+    response = await client.post(
+        "/api/users/async/login/", {"phone": phone}, content_type="application/json"
+    )
+    assert response.status_code in (200, 201), response.content
+    code = await (
+        AuthCode.objects.filter(user__phone=phone)
+        .order_by("-pk")
+        .values_list("code", flat=True)
+        .afirst()
+    )
+    response = await client.put(
+        "/api/users/async/login/",
+        {"phone": phone, "auth_code": code},
+        content_type="application/json",
+    )
+    assert response.status_code == 200, response.content
+
+
+def run_sync(requests, workers):
+    from django.db import connection
+    from django.test import Client
+
+    def worker(i):
+        try:
+            login_flow_sync(Client(), f"+7901{i:07d}")
+        finally:
+            connection.close()
+
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        list(pool.map(worker, range(requests)))
+    return time.perf_counter() - start
+
+
+def run_async(requests):
+    from django.test import AsyncClient
+
+    async def main():
+        client = AsyncClient()
+        await asyncio.gather(
+            *(login_flow_async(client, f"+7902{i:07d}") for i in range(requests))
+        )
+
+    start = time.perf_counter()
+    asyncio.run(main())
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument(
+        "--latency", type=float, default=1.0, help="Задержка SMS-шлюза, сек."
+    )
+    args = parser.parse_args()
+
+    SlowSMSBackend.latency = args.latency
+    setup_django(flush=True)
+
+    from django.test import override_settings
+
+    with override_settings(**SETTINGS):
+        elapsed = run_sync(args.requests, args.workers)
+        print(
+            f"WSGI ({args.workers} потоков): {args.requests} входов "
+            f"за {elapsed:.2f} с, "
+            f"{args.requests / elapsed:.1f} входов/с"
+        )
+        elapsed = run_async(args.requests)
+        print(
+            f"ASGI (1 цикл событий): {args.requests} входов за {elapsed:.2f} с, "
+            f"{args.requests / elapsed:.1f} входов/с"
+        )
+
+
+if __name__ == "__main__":
+    main()
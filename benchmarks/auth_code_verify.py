@@ -0,0 +1,88 @@
+"""Задержка проверки кода авторизации при большом числе просроченных кодов.
+
+Таблица кодов наполняется просроченными записями до каждой из заданных
+отметок, после чего замеряется запрос проверки из UserAuthAPIView.put.
+В конце замеряется очистка командой purge_auth_codes.
+
+    python -m benchmarks.auth_code_verify --steps 0 1000000 3000000
+"""
+
+import argparse
+import time
+from datetime import timedelta
+
+from benchmarks._common import report, setup_django
+
+
+def seed(users, count, batch_size=20000):
+    from django.conf import settings
+    from django.utils import timezone
+
+    from users.models import AuthCode
+
+    expired_at = timezone.now() - settings.AUTH_CODE_TTL - timedelta(days=1)
+    for offset in range(0, count, batch_size):
+        AuthCode.objects.bulk_create(
+            (
+                AuthCode(
+                    user_id=users[i % len(users)],
+                    code=f"{i % 10000:04d}",
+                    created_at=expired_at,
+                )
+                for i in range(offset, min(offset + batch_size, count))
+            ),
+            batch_size=batch_size,
+        )
+
+
+def verify(phone, code):
+    from users.models import AuthCode
+
+    return (
+        AuthCode.objects.active()
+        .filter(user__phone=phone, code=code)
+        .select_related("user")
+        .order_by("-created_at")
+        .first()
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--steps", type=int, nargs="+", default=[0, 100000, 1000000, 2000000]
+    )
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--lookups", type=int, default=1000)
+    args = parser.parse_args()
+
+    setup_django(flush=True)
+
+    from users.models import AuthCode, User
+
+    User.objects.bulk_create(
+        User(phone=f"+7903{i:07d}", invite_code=f"{i:06d}") for i in range(args.users)
+    )
+    users = list(User.objects.values_list("pk", flat=True))
+    user = User.objects.get(pk=users[0])
+    AuthCode.objects.create(user=user, code="4321")
+
+    seeded = 0
+    for step in sorted(args.steps):
+        seed(users, step - seeded)
+        seeded = step
+
+        timings = []
+        for _ in range(args.lookups):
+            start = time.perf_counter()
+            assert verify(user.phone, "4321") is not None
+            timings.append(time.perf_counter() - start)
+        report(f"проверка кода, просроченных записей {step}", timings)
+
+    start = time.perf_counter()
+    deleted = AuthCode.objects.purge_expired()
+    print(f"очистка: удалено {deleted} записей за {time.perf_counter() - start:.2f} с")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""Задержка PATCH профиля с аватаром разного размера.
+
+Миниатюры создаются в пуле фоновых потоков, поэтому время ответа не должно
+расти с размером изображения. Время фоновой обработки выводится отдельно.
+
+    python -m benchmarks.avatar_upload --requests 5 --sizes 500 2000 4000
+"""
+
+import argparse
+import io
+import tempfile
+import time
+
+from benchmarks._common import report, setup_django
+
+
+def make_image(side):
+    from django.core.files.uploadedfile import SimpleUploadedFile
+    from PIL import Image
+
+    buffer = io.BytesIO()
+    Image.effect_noise((side, side), 64).convert("RGB").save(buffer, "JPEG")
+    return SimpleUploadedFile("avatar.jpg", buffer.getvalue(), "image/jpeg")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=5)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[500, 2000, 4000])
+    args = parser.parse_args()
+
+    setup_django(flush=True)
+
+    from django.test import override_settings
+    from rest_framework.test import APIClient
+
+    from users import avatars
+    from users.models import User
+
+    processing = []
+    process_avatar = avatars.process_avatar
+
+    def timed_process_avatar(*task_args):
+        start = time.perf_counter()
+        try:
+            return process_avatar(*task_args)
+        finally:
+            processing.append(time.perf_counter() - start)
+
+    avatars.process_avatar = timed_process_avatar
+
+    user = User.objects.create(phone="+79990000001", invite_code="bench1")
+    client = APIClient()
+    client.force_authenticate(user)
+
+    with override_settings(MEDIA_ROOT=tempfile.mkdtemp()):
+        for side in args.sizes:
+            images = [make_image(side) for _ in range(args.requests)]
+            timings = []
+            processing.clear()
+            for image in images:
+                start = time.perf_counter()
+                response = client.patch(
+                    f"/api/users/{user.pk}/", {"avatar": image}, format="multipart"
+                )
+                timings.append(time.perf_counter() - start)
+                assert response.status_code == 200, response.content
+            report(f"{side}x{side} ответ", timings)
+
+            while len(processing) < len(images):
+                time.sleep(0.05)
+            report(f"{side}x{side} фоновая обработка", processing)
+
+
+if __name__ == "__main__":
+    main()
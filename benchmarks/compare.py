@@ -0,0 +1,64 @@
+"""Сравнение двух файлов результатов benchmarks.suite.
+
+Печатает изменение req/s и перцентилей по каждому сценарию и завершается
+с кодом 1, если новый результат хуже базового больше чем на --threshold процентов.
+
+    python -m benchmarks.compare \
+        benchmarks/results/base.json benchmarks/results/new.json
+"""
+
+import argparse
+import json
+import sys
+
+# метрика -> True, если рост означает ухудшение
+METRICS = {"rps": False, "p50_ms": True, "p95_ms": True, "p99_ms": True}
+
+
+def change(base, new):
+    return (new - base) / base * 100 if base else 0.0
+
+
+def compare(base, new, threshold):
+    """Печатает таблицу изменений, возвращает список регрессий"""
+    regressions = []
+    print(f"{base['meta']['revision']} -> {new['meta']['revision']}")
+    print(f"{'сценарий':<16}" + "".join(f"{metric:>30}" for metric in METRICS))
+    for scenario, new_summary in new["scenarios"].items():
+        base_summary = base["scenarios"].get(scenario)
+        if base_summary is None:
+            print(f"{scenario:<16} нет в базовом результате")
+            continue
+        cells = []
+        for metric, higher_is_worse in METRICS.items():
+            delta = change(base_summary[metric], new_summary[metric])
+            worse = delta if higher_is_worse else -delta
+            mark = "!" if worse > threshold else " "
+            if worse > threshold:
+                regressions.append(f"{scenario} {metric} {delta:+.1f}%")
+            cells.append(
+                f"{base_summary[metric]:>9.1f} -> {new_summary[metric]:<9.1f}"
+                f"{delta:+6.1f}%{mark}"
+            )
+        print(f"{scenario:<16}" + "".join(f"{cell:>30}" for cell in cells))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0)
+    args = parser.parse_args()
+
+    with open(args.base) as base_file, open(args.new) as new_file:
+        base, new = json.load(base_file), json.load(new_file)
+
+    regressions = compare(base, new, args.threshold)
+    if regressions:
+        print(f"Регрессии больше {args.threshold}%: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""Накладные расходы на соединение с БД в пересчете на запрос.
+
+Каждый режим запускается в отдельном процессе с переменными окружения из
+config/settings.py. Запрос имитируется сигналами request_started и
+request_finished, между которыми выполняется один простой запрос к БД.
+Пул соединений есть только у PostgreSQL, на SQLite режим pool пропускается.
+
+    BENCH_DB=postgres DB_HOST=localhost ... python -m benchmarks.db_connections
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+MODES = {
+    "new": {"DB_CONN_MAX_AGE": "0", "DB_POOL": "False"},
+    "persistent": {"DB_CONN_MAX_AGE": "60", "DB_POOL": "False"},
+    "pool": {"DB_POOL": "True"},
+}
+POSTGRES_MODES = ("pool",)
+
+
+def run_child(requests):
+    from benchmarks._common import report, setup_django
+
+    setup_django()
+
+    from django.core import signals
+    from django.db import connection
+
+    from users.models import User
+
+    timings = []
+    for _ in range(requests):
+        start = time.perf_counter()
+        signals.request_started.send(sender=None)
+        User.objects.exists()
+        signals.request_finished.send(sender=None)
+        timings.append(time.perf_counter() - start)
+    report(f"{os.environ['BENCH_MODE']} ({connection.vendor})", timings)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--modes", nargs="+", choices=tuple(MODES), default=list(MODES))
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        run_child(args.requests)
+        return
+
+    postgres = os.getenv("BENCH_DB", "sqlite") == "postgres"
+    for mode in args.modes:
+        if mode in POSTGRES_MODES and not postgres:
+            print(f"{mode}: пропущен, требуется BENCH_DB=postgres")
+            continue
+        env = {**os.environ, **MODES[mode], "BENCH_MODE": mode}
+        result = subprocess.run(
+            [sys.executable, "-m", "benchmarks.db_connections", "--child"]
+            + ["--requests", str(args.requests)],
+            env=env,
+            capture_output=True,
+            text=True,
+        )
+        if result.returncode:
+            last_line = (result.stderr.strip().splitlines() or ["?"])[-1]
+            print(f"{mode}: ошибка - {last_line}")
+        else:
+            print(result.stdout.strip())
+
+
+if __name__ == "__main__":
+    main()
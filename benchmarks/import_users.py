@@ -0,0 +1,48 @@
+"""Скорость массового создания пользователей через import_users.
+
+На Postgres строки загружаются через COPY, на SQLite - через executemany.
+
+python -m benchmarks.import_users --rows 200000 --batch-size 5000
+BENCH_DB=postgres python -m benchmarks.import_users --rows 100000
+"""
+
+import argparse
+import time
+
+from benchmarks._common import setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--rows", type=int, default=200_000)
+    parser.add_argument("--batch-size", type=int, default=5000)
+    args = parser.parse_args()
+
+    setup_django(flush=True)
+
+    from django.db import connection
+
+    from users.services import import_users
+
+    phones = (f"+79{i:09d}" for i in range(args.rows))
+    start = time.perf_counter()
+    inserted, skipped = import_users(phones, batch_size=args.batch_size)
+    elapsed = time.perf_counter() - start
+    print(
+        f"{connection.vendor}: добавлено {inserted}, пропущено {skipped} "
+        f"за {elapsed:.2f} с: {inserted / elapsed:.0f} строк/с"
+    )
+
+    start = time.perf_counter()
+    inserted, skipped = import_users(
+        (f"+79{i:09d}" for i in range(args.rows)), batch_size=args.batch_size
+    )
+    elapsed = time.perf_counter() - start
+    print(
+        f"Повторный импорт: пропущено {skipped} за {elapsed:.2f} с: "
+        f"{skipped / elapsed:.0f} строк/с"
+    )
+
+
+if __name__ == "__main__":
+    main()
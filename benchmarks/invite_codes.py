@@ -0,0 +1,91 @@
+"""Стоимость выделения Invite кодов и вероятность совпадений.
+
+Сравнивается прежний генератор (перемешивание списка и random.choice) с
+текущим (secrets.randbelow и готовый алфавит), замеряется выдача кода из
+пула в БД, а для заданного числа пользователей оценивается вероятность
+совпадения нового кода с уже выданными: аналитически и моделированием.
+
+    python -m benchmarks.invite_codes --populations 1000000 10000000
+"""
+
+import argparse
+import random
+import secrets
+import timeit
+
+
+def legacy_generate_invite_code():
+    str1 = "0123456789"
+    str2 = "qwertyuiopasdfghjklzxcvbnm"
+    str3 = str2.upper()
+    rand_list = list(str1 + str2 + str3)
+    random.shuffle(rand_list)
+    return "".join([random.choice(rand_list) for i in range(6)])
+
+
+def bench_generators(number):
+    from users.services import generate_invite_code
+
+    for title, func in (
+        ("прежний генератор", legacy_generate_invite_code),
+        ("generate_invite_code", generate_invite_code),
+    ):
+        elapsed = timeit.timeit(func, number=number)
+        print(f"{title}: {elapsed / number * 1e6:.2f} мкс/код")
+
+
+def bench_pool(size):
+    from django.test import override_settings
+
+    from users.services import allocate_invite_code, refill_invite_code_pool
+
+    elapsed = timeit.timeit(lambda: refill_invite_code_pool(size), number=1)
+    print(f"пополнение пула: {size} кодов за {elapsed:.2f} с")
+    with override_settings(INVITE_CODE_POOL_ENABLED=True):
+        elapsed = timeit.timeit(allocate_invite_code, number=size)
+    print(f"выдача из пула: {elapsed / size * 1e6:.1f} мкс/код")
+
+
+def collision_rate(population, samples, simulate):
+    from users.services import INVITE_CODE_SPACE
+
+    expected = population / INVITE_CODE_SPACE
+    line = (
+        f"{population} пользователей: ожидаемая доля совпадений {expected:.2e}, "
+        f"вероятность исчерпать 5 попыток {expected ** 5:.2e}"
+    )
+    if simulate:
+        issued = {secrets.randbelow(INVITE_CODE_SPACE) for _ in range(population)}
+        hits = sum(
+            secrets.randbelow(INVITE_CODE_SPACE) in issued for _ in range(samples)
+        )
+        line += f", измерено {hits / samples:.2e} на {samples} попытках"
+    print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--populations", type=int, nargs="+", default=[1000000, 10000000]
+    )
+    parser.add_argument("--samples", type=int, default=1000000)
+    parser.add_argument("--number", type=int, default=100000)
+    parser.add_argument("--pool-size", type=int, default=10000)
+    parser.add_argument(
+        "--no-simulate",
+        action="store_true",
+        help="Только аналитическая оценка (моделирование 10M требует ~1 ГБ памяти)",
+    )
+    args = parser.parse_args()
+
+    from benchmarks._common import setup_django
+
+    setup_django(flush=True)
+    bench_generators(args.number)
+    bench_pool(args.pool_size)
+    for population in args.populations:
+        collision_rate(population, args.samples, not args.no_simulate)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+"""Пропускная способность POST /api/users/login/ для разных диспетчеров SMS.
+
+Режим sync воспроизводит прежнее поведение (доставка в потоке запроса),
+thread_pool и outbox возвращают ответ сразу после сохранения кода.
+
+    python -m benchmarks.login_throughput --requests 10 --latency 2
+"""
+
+import argparse
+import time
+
+from benchmarks._common import SlowSMSBackend, report, setup_django
+
+DISPATCHERS = {
+    "sync": "users.delivery.SyncDispatcher",
+    "thread_pool": "users.delivery.ThreadPoolDispatcher",
+    "outbox": "users.delivery.OutboxDispatcher",
+}
+
+
+def run(dispatcher, requests):
+    from django.test import Client, override_settings
+
+    client = Client()
+    timings = []
+    with override_settings(
+        SMS_BACKEND="benchmarks._common.SlowSMSBackend", SMS_DISPATCHER=dispatcher
+    ):
+        for i in range(requests):
+            start = time.perf_counter()
+            response = client.post("/api/users/login/", {"phone": f"+7900{i:07d}"})
+            timings.append(time.perf_counter() - start)
+            assert response.status_code in (200, 201), response.content
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=10)
+    parser.add_argument(
+        "--latency", type=float, default=2.0, help="Задержка SMS-шлюза, сек."
+    )
+    parser.add_argument("--modes", nargs="+", default=list(DISPATCHERS))
+    args = parser.parse_args()
+
+    SlowSMSBackend.latency = args.latency
+    for mode in args.modes:
+        setup_django(flush=True)
+        report(mode, run(DISPATCHERS[mode], args.requests))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+"""Накладные расходы метрик на запрос.
+
+Замеряется запись значения в гистограмму и счетчик, а также обработка запроса
+MetricsMiddleware по сравнению с тем же представлением без middleware
+(без запросов к БД и с несколькими запросами, время которых учитывается).
+
+    python -m benchmarks.metrics_overhead --iterations 100000
+"""
+
+import argparse
+import time
+
+from benchmarks._common import setup_django
+
+
+def per_call(func, iterations):
+    start = time.perf_counter()
+    for _ in range(iterations):
+        func()
+    return (time.perf_counter() - start) / iterations * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=100000)
+    parser.add_argument("--queries", type=int, default=3)
+    args = parser.parse_args()
+
+    setup_django()
+
+    from django.db import connection
+    from django.http import HttpResponse
+    from django.test import RequestFactory
+    from django.urls import resolve
+
+    from config import metrics
+
+    histogram = metrics.Histogram("bench_seconds", "Замер", ("route",))
+    counter = metrics.Counter("bench_total", "Замер")
+    observe = per_call(lambda: histogram.observe(0.03, "r"), args.iterations)
+    print(f"Histogram.observe: {observe:.2f} мкс")
+    print(f"Counter.inc: {per_call(counter.inc, args.iterations):.2f} мкс")
+
+    request = RequestFactory().get("/api/users/list/")
+    request.resolver_match = resolve("/api/users/list/")
+    response = HttpResponse()
+
+    def view(request):
+        return response
+
+    def db_view(request):
+        with connection.cursor() as cursor:
+            for _ in range(args.queries):
+                cursor.execute("SELECT 1")
+        return response
+
+    middleware = metrics.MetricsMiddleware(view)
+    db_middleware = metrics.MetricsMiddleware(db_view)
+    # запросы к БД выполняются с уже подключенной оберткой
+    db_view(request)
+
+    iterations = args.iterations // 10
+    for title, bare, wrapped in (
+        ("без запросов к БД", view, middleware),
+        (f"{args.queries} запроса к БД", db_view, db_middleware),
+    ):
+        base = per_call(lambda: bare(request), iterations)
+        measured = per_call(lambda: wrapped(request), iterations)
+        print(
+            f"Запрос {title}: {base:.2f} мкс без метрик, "
+            f"{measured:.2f} мкс с метриками, "
+            f"накладные расходы {measured - base:.2f} мкс"
+        )
+
+    start = time.perf_counter()
+    metrics.render()
+    print(f"Вывод /metrics: {(time.perf_counter() - start) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Стоимость приведения номера телефона к E.164 на пути входа.
+
+Сравнивается разбор phonenumbers без кеша, normalize_phone с кешем,
+normalize_phone для номеров, уже записанных в E.164 (как в файлах импорта),
+и валидация UserRegistrationSerializer целиком.
+
+    python -m benchmarks.phone_normalize --numbers 20000
+"""
+
+import argparse
+import time
+
+
+def measure(title, func, values):
+    start = time.perf_counter()
+    for value in values:
+        func(value)
+    elapsed = time.perf_counter() - start
+    print(f"{title}: {elapsed / len(values) * 1e6:.2f} мкс на номер")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--numbers", type=int, default=20000)
+    args = parser.parse_args()
+
+    from benchmarks._common import setup_django
+
+    setup_django()
+
+    import phonenumbers
+
+    from users.phones import _parse, normalize_phone
+    from users.serializers import UserRegistrationSerializer
+
+    phones = [
+        f"+7 905 {i // 10000:03d}-{i % 10000 // 100:02d}-{i % 100:02d}"
+        for i in range(args.numbers)
+    ]
+
+    def parse_uncached(phone):
+        number = phonenumbers.parse(phone, "RU")
+        phonenumbers.is_valid_number(number)
+        return phonenumbers.format_number(number, phonenumbers.PhoneNumberFormat.E164)
+
+    def validate(phone):
+        serializer = UserRegistrationSerializer(data={"phone": phone})
+        serializer.is_valid(raise_exception=True)
+
+    measure("phonenumbers без кеша", parse_uncached, phones)
+    _parse.cache_clear()
+    measure("normalize_phone, первый вызов", normalize_phone, phones)
+    measure("normalize_phone, повторный вызов", normalize_phone, phones)
+    measure(
+        "normalize_phone, номер в E.164",
+        normalize_phone,
+        [f"+79{i:09d}" for i in range(args.numbers)],
+    )
+    measure("UserRegistrationSerializer.is_valid", validate, phones)
+
+
+if __name__ == "__main__":
+    main()
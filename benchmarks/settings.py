@@ -0,0 +1,33 @@
+"""Настройки Django для бенчмарков.
+
+По умолчанию используется файл SQLite во временном каталоге, для замеров
+на локальном Postgres задайте BENCH_DB=postgres и переменные DB_*.
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("SECRET_KEY", "benchmark-secret-key-not-for-production-use")
+
+from config.settings import *  # noqa: E402,F401,F403
+
+DEBUG = False
+ALLOWED_HOSTS = ["*"]
+
+if os.getenv("BENCH_DB", "sqlite") == "sqlite":
+    DATABASES = {
+        "default": {
+            "ENGINE": "django.db.backends.sqlite3",
+            "NAME": os.getenv(
+                "BENCH_SQLITE_PATH",
+                os.path.join(tempfile.gettempdir(), "graduatework-bench.sqlite3"),
+            ),
+            "CONN_MAX_AGE": DATABASES["default"]["CONN_MAX_AGE"],  # noqa: F405
+        }
+    }
+
+LOGGING = {
+    "version": 1,
+    "disable_existing_loggers": False,
+    "loggers": {"rest_framework_simplejwt": {"level": "ERROR"}},
+}
@@ -0,0 +1,131 @@
+"""Нагрузочный smoke-тест сервера gunicorn с настройками config/gunicorn_conf.py.
+
+Без --url запускает локальный gunicorn на настройках бенчмарков и отправляет
+параллельные POST /api/users/login/. Завершается с кодом 1 при ошибках.
+
+    python -m benchmarks.smoke_load --requests 500 --concurrency 20
+    python -m benchmarks.smoke_load --url http://127.0.0.1:8000
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from benchmarks._common import report, setup_django
+
+
+def start_server(port, workers, server_mode, **extra_env):
+    env = {
+        **os.environ,
+        "DJANGO_SETTINGS_MODULE": "benchmarks.settings",
+        "SMS_BACKEND": "users.delivery.LocMemSMSBackend",
+        "PORT": str(port),
+        "GUNICORN_WORKERS": str(workers),
+        "GUNICORN_ACCESSLOG": "",
+        "SERVER_MODE": server_mode,
+        # воркерам нужен общий кеш, без сервера кеша подойдет файловый
+        "CACHE_BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.filebased.FileBasedCache"
+        ),
+        "CACHE_LOCATION": os.getenv(
+            "CACHE_LOCATION", os.path.join(tempfile.gettempdir(), "graduatework-cache")
+        ),
+        # ограничения частоты входа не должны влиять на замеры
+        "LOGIN_PHONE_RATE": "1000000/s",
+        "LOGIN_IP_RATE": "1000000/s",
+        **extra_env,
+    }
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "python:config.gunicorn_conf"],
+        env=env,
+    )
+
+
+def wait_ready(url, server, timeout=30):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if server is not None and server.poll() is not None:
+            raise SystemExit("gunicorn завершился при запуске")
+        try:
+            urllib.request.urlopen(f"{url}/api/users/login/", timeout=1)
+        except urllib.error.HTTPError:
+            return
+        except OSError:
+            time.sleep(0.2)
+        else:
+            return
+    raise SystemExit(f"Сервер {url} не ответил за {timeout} сек.")
+
+
+def login(url, phone):
+    request = urllib.request.Request(
+        f"{url}/api/users/login/",
+        data=json.dumps({"phone": phone}).encode(),
+        headers={"Content-Type": "application/json"},
+        method="POST",
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except OSError:
+        status = None
+    return time.perf_counter() - start, status
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Адрес уже запущенного сервера")
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--server-mode", choices=("wsgi", "asgi"), default="wsgi")
+    args = parser.parse_args()
+
+    server = None
+    url = args.url
+    if url is None:
+        setup_django(flush=True)
+        server = start_server(args.port, args.workers, args.server_mode)
+        url = f"http://127.0.0.1:{args.port}"
+
+    try:
+        wait_ready(url, server)
+        # уникальный префикс, чтобы повторные запуски создавали новых пользователей
+        prefix = uuid.uuid4().int % 10**3
+        phones = [f"+79{prefix:03d}{i:06d}" for i in range(args.requests)]
+        with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+            start = time.perf_counter()
+            results = list(executor.map(lambda phone: login(url, phone), phones))
+            elapsed = time.perf_counter() - start
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    errors = [status for _, status in results if status not in (200, 201)]
+    report(
+        f"{args.server_mode}, concurrency={args.concurrency}", [t for t, _ in results]
+    )
+    print(
+        f"Общее время {elapsed:.2f} с, {len(results) / elapsed:.1f} req/s, "
+        f"ошибок: {len(errors)}"
+    )
+    if errors:
+        print(f"Коды ответов с ошибками: {sorted(set(map(str, errors)))}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
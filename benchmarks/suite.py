@@ -0,0 +1,279 @@
+"""Набор нагрузочных замеров эндпоинтов /api/users/ с записью результатов в JSON.
+
+Заполняет БД фоновыми пользователями и просроченными кодами авторизации,
+запускает локальный gunicorn на настройках бенчмарков (или использует --url
+сервера с той же БД) и прогоняет сценарии параллельными клиентами. Для каждого
+сценария сохраняются req/s и p50/p95/p99, файлы разных коммитов сравниваются
+командой benchmarks.compare.
+
+    python -m benchmarks.suite --users 100000 --auth-codes 100000 --requests 500
+    python -m benchmarks.suite --scenario login_post --scenario profile_get
+    python -m benchmarks.compare \
+        benchmarks/results/base.json benchmarks/results/new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from benchmarks._common import setup_django, summarize
+from benchmarks.smoke_load import start_server, wait_ready
+
+RESULTS_DIR = Path(__file__).resolve().parent / "results"
+PASSWORD = "benchmark-password"
+AUTH_CODE = "1234"
+
+# сценарий -> ожидаемый код ответа
+SCENARIOS = {
+    "login_post": 200,
+    "login_put": 200,
+    "token": 200,
+    "token_refresh": 200,
+    "profile_get": 200,
+    "profile_put": 200,
+    "list": 200,
+}
+
+
+def seed(users, auth_codes, actors):
+    """Заполняет БД, возвращает данные клиентов сценариев.
+
+    Фоновые пользователи и просроченные коды задают объем таблиц, каждый запрос
+    сценария выполняется от отдельного пользователя-клиента с паролем, кодом
+    авторизации и парой токенов.
+    """
+    from django.contrib.auth.hashers import make_password
+
+    from benchmarks.auth_code_verify import seed as seed_auth_codes
+    from users.models import AuthCode, User
+    from users.services import import_users
+    from users.tokens import UserRefreshToken
+
+    import_users(f"+7900{i:07d}" for i in range(users))
+    import_users(f"+7901{i:07d}" for i in range(actors))
+
+    clients = list(
+        User.objects.filter(phone__startswith="+7901")
+        .order_by("phone")
+        .values_list("pk", "phone")
+    )
+    # один хеш на всех: хеширование каждого пароля заняло бы минуты
+    User.objects.filter(phone__startswith="+7901").update(
+        password=make_password(PASSWORD), is_active=True
+    )
+    AuthCode.objects.bulk_create(
+        AuthCode(user_id=pk, code=AUTH_CODE) for pk, _ in clients
+    )
+    if auth_codes:
+        seed_auth_codes(
+            list(User.objects.values_list("pk", flat=True)[:10000]), auth_codes
+        )
+
+    staff = User.objects.create_user(
+        phone="+79020000000", is_active=True, is_staff=True
+    )
+    tokens = [
+        UserRefreshToken.for_user(User(pk=pk, phone=phone, is_active=True))
+        for pk, phone in clients
+    ]
+    return {
+        "clients": [
+            {
+                "pk": pk,
+                "phone": phone,
+                "access": str(token.access_token),
+                "refresh": str(token),
+            }
+            for (pk, phone), token in zip(clients, tokens)
+        ],
+        "staff_access": str(UserRefreshToken.for_user(staff).access_token),
+    }
+
+
+def build_requests(scenario, data, count):
+    """Список запросов (метод, путь, тело, токен) сценария"""
+    clients = data["clients"][:count]
+    if scenario == "login_post":
+        return [("POST", "login/", {"phone": c["phone"]}, None) for c in clients]
+    if scenario == "login_put":
+        return [
+            ("PUT", "login/", {"phone": c["phone"], "auth_code": AUTH_CODE}, None)
+            for c in clients
+        ]
+    if scenario == "token":
+        return [
+            ("POST", "token/", {"phone": c["phone"], "password": PASSWORD}, None)
+            for c in clients
+        ]
+    if scenario == "token_refresh":
+        return [
+            ("POST", "token/refresh/", {"refresh": c["refresh"]}, None) for c in clients
+        ]
+    if scenario == "profile_get":
+        return [("GET", f"{c['pk']}/", None, c["access"]) for c in clients]
+    if scenario == "profile_put":
+        return [
+            (
+                "PUT",
+                f"{c['pk']}/",
+                {"phone": c["phone"], "city": "Москва"},
+                c["access"],
+            )
+            for c in clients
+        ]
+    return [("GET", "list/", None, data["staff_access"])] * count
+
+
+def send(url, method, path, body, token):
+    headers = {"Content-Type": "application/json"}
+    if token:
+        headers["Authorization"] = f"Bearer {token}"
+    request = urllib.request.Request(
+        f"{url}/api/users/{path}",
+        data=None if body is None else json.dumps(body).encode(),
+        headers=headers,
+        method=method,
+    )
+    start = time.perf_counter()
+    try:
+        with urllib.request.urlopen(request, timeout=30) as response:
+            response.read()
+            status = response.status
+    except urllib.error.HTTPError as exc:
+        status = exc.code
+    except OSError:
+        status = None
+    return time.perf_counter() - start, status
+
+
+def run_scenario(url, requests, expected_status, concurrency):
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        start = time.perf_counter()
+        results = list(executor.map(lambda args: send(url, *args), requests))
+        elapsed = time.perf_counter() - start
+
+    summary = summarize([timing for timing, _ in results], elapsed)
+    errors = [str(status) for _, status in results if status != expected_status]
+    summary["errors"] = len(errors)
+    if errors:
+        summary["error_statuses"] = sorted(set(errors))
+    return summary
+
+
+def git_revision():
+    try:
+        revision = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+        dirty = subprocess.run(
+            ["git", "status", "--porcelain", "--untracked-files=no"],
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{revision}-dirty" if dirty else revision
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--url", help="Адрес уже запущенного сервера с той же БД")
+    parser.add_argument(
+        "--scenario",
+        action="append",
+        choices=SCENARIOS,
+        help="Сценарий для запуска, по умолчанию все",
+    )
+    parser.add_argument("--users", type=int, default=10000)
+    parser.add_argument("--auth-codes", type=int, default=10000)
+    parser.add_argument("--requests", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--server-mode", choices=("wsgi", "asgi"), default="wsgi")
+    parser.add_argument("--output", type=Path, help="Файл результатов")
+    args = parser.parse_args()
+
+    setup_django(flush=True)
+
+    from django.db import connection
+
+    revision = git_revision()
+    output = args.output or RESULTS_DIR / f"{revision}.json"
+    scenarios = args.scenario or list(SCENARIOS)
+
+    start = time.perf_counter()
+    data = seed(args.users, args.auth_codes, args.requests)
+    print(f"БД заполнена за {time.perf_counter() - start:.1f} с")
+
+    server = None
+    url = args.url
+    if url is None:
+        server = start_server(
+            args.port,
+            args.workers,
+            args.server_mode,
+            AUTH_CODE_STORE="users.code_store.ModelCodeStore",
+        )
+        url = f"http://127.0.0.1:{args.port}"
+
+    results = {}
+    try:
+        wait_ready(url, server)
+        run_scenario(
+            url, build_requests("list", data, args.warmup), 200, args.concurrency
+        )
+        for scenario in scenarios:
+            requests = build_requests(scenario, data, args.requests)
+            results[scenario] = run_scenario(
+                url, requests, SCENARIOS[scenario], args.concurrency
+            )
+            summary = results[scenario]
+            print(
+                f"{scenario}: {summary['rps']} req/s, p50={summary['p50_ms']} ms, "
+                f"p95={summary['p95_ms']} ms, p99={summary['p99_ms']} ms, "
+                f"ошибок: {summary['errors']} {summary.get('error_statuses', '')}"
+            )
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+
+    document = {
+        "meta": {
+            "revision": revision,
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+            "python": platform.python_version(),
+            "cpu_count": os.cpu_count(),
+            "database": connection.vendor,
+            "server_mode": "external" if args.url else args.server_mode,
+            "workers": args.workers,
+            "concurrency": args.concurrency,
+            "users": args.users,
+            "auth_codes": args.auth_codes,
+        },
+        "scenarios": results,
+    }
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(document, ensure_ascii=False, indent=2))
+    print(f"Результаты записаны в {output}")
+
+    if any(summary["errors"] for summary in results.values()):
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Процессорное время на выдачу токена в POST /api/users/token/.
+
+Сравнивается вход по паролю (ModelBackend, PBKDF2) и по одноразовому коду
+(PhoneCodeBackend).
+
+    python -m benchmarks.token_cpu --requests 50
+"""
+
+import argparse
+import time
+
+from benchmarks._common import setup_django
+
+
+def issue_tokens(client, requests, data, before=None):
+    cpu = 0.0
+    for _ in range(requests):
+        if before:
+            before()
+        start = time.process_time()
+        response = client.post("/api/users/token/", data)
+        cpu += time.process_time() - start
+        assert response.status_code == 200, response.content
+    return cpu / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--requests", type=int, default=50)
+    args = parser.parse_args()
+
+    setup_django(flush=True)
+
+    from django.test import Client
+
+    from users.code_store import get_code_store
+    from users.models import User
+
+    client = Client()
+    admin = User.objects.create_superuser(phone="+79990000001", password="S3cret-pass")
+    user = User.objects.create(
+        phone="+79990000002", invite_code="bench1", is_active=True
+    )
+
+    cpu = issue_tokens(
+        client, args.requests, {"phone": admin.phone, "password": "S3cret-pass"}
+    )
+    print(f"пароль (PBKDF2): {cpu * 1000:.2f} мс CPU на токен")
+
+    cpu = issue_tokens(
+        client,
+        args.requests,
+        {"phone": user.phone, "password": "1234"},
+        before=lambda: get_code_store().issue(user, "1234"),
+    )
+    print(f"код авторизации: {cpu * 1000:.2f} мс CPU на токен")
+
+
+if __name__ == "__main__":
+    main()
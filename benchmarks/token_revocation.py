@@ -0,0 +1,81 @@
+"""Стоимость проверки отзыва токена при большом числе отозванных токенов.
+
+Сравнивается проверка через фильтр в памяти процесса (users.revocation.is_revoked)
+и точный запрос к таблице отозванных токенов на каждый запрос. Также
+замеряются доля ложных срабатываний фильтра, которые уходят в БД, и стоимость
+одного отзыва (запись в БД и в журнал отзывов без перестройки фильтра).
+
+    python -m benchmarks.token_revocation --revoked 100000 --checks 10000
+"""
+
+import argparse
+import time
+import uuid
+from datetime import timedelta
+
+from benchmarks._common import report, setup_django
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--revoked", type=int, default=100000)
+    parser.add_argument("--checks", type=int, default=10000)
+    args = parser.parse_args()
+
+    setup_django(flush=True)
+
+    from django.db import connection
+    from django.test.utils import CaptureQueriesContext
+    from django.utils import timezone
+
+    from users import revocation
+    from users.models import RevokedToken, User
+    from users.tokens import UserRefreshToken
+
+    expires_at = timezone.now() + timedelta(days=1)
+    RevokedToken.objects.bulk_create(
+        (
+            RevokedToken(jti=uuid.uuid4().hex, expires_at=expires_at)
+            for _ in range(args.revoked)
+        ),
+        batch_size=5000,
+    )
+    start = time.perf_counter()
+    revocation.publish_filter()
+    print(f"Построение фильтра: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    tokens = [
+        UserRefreshToken.for_user(User(pk=i, is_active=True))
+        for i in range(args.checks)
+    ]
+    # прогрев: первое обращение к фильтру и запросам
+    for token in tokens[:10]:
+        revocation.is_revoked(token)
+
+    timings = []
+    with CaptureQueriesContext(connection) as queries:
+        for token in tokens:
+            start = time.perf_counter()
+            revocation.is_revoked(token)
+            timings.append(time.perf_counter() - start)
+    report(f"фильтр, отозвано {args.revoked}", timings)
+    print(f"Запросов к БД из-за ложных срабатываний: {len(queries)}")
+
+    timings = []
+    for token in tokens:
+        start = time.perf_counter()
+        RevokedToken.objects.filter(jti=token["jti"]).exists()
+        timings.append(time.perf_counter() - start)
+    report(f"запрос к БД, отозвано {args.revoked}", timings)
+
+    timings = []
+    for token in tokens[:1000]:
+        start = time.perf_counter()
+        # вне транзакции публикация в журнал выполняется сразу
+        revocation.revoke_token(token)
+        timings.append(time.perf_counter() - start)
+    report(f"отзыв токена, отозвано {args.revoked}", timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,159 @@
+"""Настройки gunicorn для запуска в production.
+
+    gunicorn -c python:config.gunicorn_conf
+
+SERVER_MODE=asgi запускает config.asgi под воркерами uvicorn.
+"""
+
+import math
+import os
+import tempfile
+
+from django.conf import settings
+
+# Квота CPU контейнера: cgroup v2, затем cgroup v1
+CGROUP_CPU_MAX = "/sys/fs/cgroup/cpu.max"
+CGROUP_V1_CPU_QUOTA = "/sys/fs/cgroup/cpu/cpu.cfs_quota_us"
+CGROUP_V1_CPU_PERIOD = "/sys/fs/cgroup/cpu/cpu.cfs_period_us"
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return file.read().split()
+    except OSError:
+        return None
+
+
+def cgroup_cpu_quota():
+    """Квота CPU cgroup в долях ядра, None - квота не задана"""
+    values = _read(CGROUP_CPU_MAX)
+    if values is None:
+        quota, period = _read(CGROUP_V1_CPU_QUOTA), _read(CGROUP_V1_CPU_PERIOD)
+        if not quota or not period:
+            return None
+        values = quota + period
+    if len(values) < 2 or values[0] in ("max", "-1"):
+        return None
+    try:
+        quota, period = int(values[0]), int(values[1])
+    except ValueError:
+        return None
+    if quota <= 0 or period <= 0:
+        return None
+    return quota / period
+
+
+def available_cpu_count():
+    """Число CPU, доступных процессу.
+
+    os.cpu_count() возвращает число CPU хоста: в контейнере с ограничением
+    по CPU (cpuset или квота cgroup) воркеров было бы больше, чем ядер.
+    """
+    if hasattr(os, "sched_getaffinity"):
+        count = len(os.sched_getaffinity(0))
+    else:
+        count = os.cpu_count() or 1
+    quota = cgroup_cpu_quota()
+    if quota is not None:
+        count = min(count, math.ceil(quota))
+    return max(count, 1)
+
+
+server_mode = os.getenv("SERVER_MODE", "wsgi")
+cpu_count = available_cpu_count()
+
+bind = f"0.0.0.0:{os.getenv('PORT') or 8000}"
+
+if server_mode == "asgi":
+    wsgi_app = "config.asgi:application"
+    worker_class = "uvicorn.workers.UvicornWorker"
+    default_workers = cpu_count
+else:
+    wsgi_app = "config.wsgi:application"
+    worker_class = "sync"
+    default_workers = cpu_count * 2 + 1
+
+workers = int(os.getenv("GUNICORN_WORKERS") or default_workers)
+
+# Каталог, через который воркеры передают метрики в /metrics
+os.environ.setdefault(
+    "METRICS_DIR", os.path.join(tempfile.gettempdir(), "graduatework-metrics")
+)
+
+# Приложение загружается в мастер-процессе до fork, воркеры разделяют память
+preload_app = True
+
+# Воркер перезапускается после max_requests запросов, jitter разносит
+# перезапуски воркеров по времени
+max_requests = int(os.getenv("GUNICORN_MAX_REQUESTS", 1000))
+max_requests_jitter = int(os.getenv("GUNICORN_MAX_REQUESTS_JITTER", 100))
+timeout = int(os.getenv("GUNICORN_TIMEOUT", 30))
+graceful_timeout = int(os.getenv("GUNICORN_GRACEFUL_TIMEOUT", 30))
+keepalive = int(os.getenv("GUNICORN_KEEPALIVE", 5))
+
+accesslog = os.getenv("GUNICORN_ACCESSLOG", "-") or None
+errorlog = "-"
+
+# Кеши, через которые воркеры разделяют состояние: при нескольких воркерах
+# они не могут храниться в памяти процесса
+SHARED_CACHE_SETTINGS = ("THROTTLE_CACHE", "PROFILE_CACHE", "TOKEN_REVOCATION_CACHE")
+PROCESS_LOCAL_CACHE_BACKENDS = (
+    "django.core.cache.backends.locmem.LocMemCache",
+    "django.core.cache.backends.dummy.DummyCache",
+)
+
+
+def check_shared_caches(workers):
+    """Останавливает запуск, если общий для воркеров кеш локален для процесса"""
+    if workers < 2:
+        return
+    local = [
+        name
+        for name in SHARED_CACHE_SETTINGS
+        if settings.CACHES[getattr(settings, name)]["BACKEND"]
+        in PROCESS_LOCAL_CACHE_BACKENDS
+    ]
+    if local:
+        raise RuntimeError(
+            f"{', '.join(local)}: кеш в памяти процесса не разделяется {workers} "
+            "воркерами, задайте общий кеш (CACHE_BACKEND, CACHE_LOCATION) "
+            "или GUNICORN_WORKERS=1"
+        )
+
+
+def when_ready(server):
+    from django.db import connections
+
+    check_shared_caches(server.num_workers)
+
+    from config.schema import get_schema_document
+
+    # схема OpenAPI загружается в мастер-процессе и разделяется воркерами
+    get_schema_document()
+    from users import revocation
+
+    # фильтр отозванных токенов строится по БД один раз до запуска воркеров
+    revocation.get_filter()
+    # соединения, открытые при загрузке приложения, не должны достаться воркерам
+    connections.close_all()
+
+    if settings.METRICS_ENABLED and settings.METRICS_DIR:
+        from config import metrics
+
+        # файлы прошлого запуска не должны попасть в счетчики
+        metrics.clear_directory()
+
+
+def post_fork(server, worker):
+    if settings.METRICS_ENABLED:
+        from config import metrics
+
+        metrics.start_worker()
+
+
+def child_exit(server, worker):
+    if settings.METRICS_ENABLED and settings.METRICS_DIR:
+        from config import metrics
+
+        metrics.mark_process_dead(worker.pid)
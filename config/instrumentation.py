@@ -0,0 +1,262 @@
+"""Замеры SQL и времени обработки запросов.
+
+InstrumentationMiddleware (включается настройкой INSTRUMENTATION_ENABLED) считает
+для каждого запроса число запросов к БД, их суммарное время, время сериализаторов
+и представления. Результат отдается в заголовке Server-Timing и пишется в лог
+строкой JSON. Запросы одного вида, повторенные больше
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD раз, отмечаются как N+1.
+
+QueryBudgetTestMixin проверяет в тестах бюджет запросов к БД на эндпоинт.
+"""
+
+import contextvars
+import functools
+import json
+import logging
+import re
+import time
+from collections import Counter
+from contextlib import contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import DEFAULT_DB_ALIAS, connections
+from django.db.backends.signals import connection_created
+from django.test.utils import CaptureQueriesContext
+from rest_framework.serializers import BaseSerializer
+
+logger = logging.getLogger(__name__)
+
+_current = contextvars.ContextVar("request_metrics", default=None)
+_serializers_timed = False
+
+_LITERAL_RE = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+_LIST_RE = re.compile(r"\(\s*%s(?:\s*,\s*%s)*\s*\)")
+
+
+def sql_shape(sql):
+    """Вид запроса: SQL без значений, списки IN и VALUES свернуты"""
+    return _LIST_RE.sub("(...)", _LITERAL_RE.sub("%s", sql))
+
+
+class RequestMetrics:
+    """Замеры одного запроса"""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.view_started = None
+        self.queries = 0
+        self.db_time = 0.0
+        self.serializer_time = 0.0
+        self.view_time = 0.0
+        self.statements = Counter()
+        self._in_serializer = False
+
+    def add_query(self, sql, duration):
+        self.queries += 1
+        self.db_time += duration
+        self.statements[sql] += 1
+
+    def repeated_queries(self, threshold):
+        """Виды запросов, повторенные больше threshold раз"""
+        if self.queries <= threshold:
+            return []
+        shapes = Counter()
+        for sql, count in self.statements.items():
+            shapes[sql_shape(sql)] += count
+        return [(shape, count) for shape, count in shapes.items() if count > threshold]
+
+
+def _execute_wrapper(execute, sql, params, many, context):
+    metrics = _current.get()
+    if metrics is None:
+        return execute(sql, params, many, context)
+    start = time.perf_counter()
+    try:
+        return execute(sql, params, many, context)
+    finally:
+        metrics.add_query(sql, time.perf_counter() - start)
+
+
+def _install_wrapper(connection, **kwargs):
+    if _execute_wrapper not in connection.execute_wrappers:
+        connection.execute_wrappers.append(_execute_wrapper)
+
+
+def install_thread_wrappers():
+    """Подключает замер запросов к открытым соединениям текущего потока"""
+    for conn in connections.all(initialized_only=True):
+        _install_wrapper(conn)
+
+
+def install_query_tracking():
+    """Подключает замер запросов ко всем соединениям с БД"""
+    # соединения потоков sync_to_async создаются позже текущих
+    connection_created.connect(_install_wrapper, dispatch_uid=__name__)
+    install_thread_wrappers()
+
+
+def start_request():
+    """Начинает замеры запроса, возвращает (замеры, токен для end_request).
+
+    Если замеры уже начаты внешним middleware, возвращаются они же.
+    """
+    metrics = _current.get()
+    if metrics is not None:
+        return metrics, None
+    install_thread_wrappers()
+    metrics = RequestMetrics()
+    return metrics, _current.set(metrics)
+
+
+def end_request(token):
+    if token is not None:
+        _current.reset(token)
+
+
+def view_started():
+    """Отмечает начало работы представления"""
+    # в асинхронном режиме вызывается в потоке, где выполняются запросы ORM
+    install_thread_wrappers()
+    metrics = _current.get()
+    if metrics is not None and metrics.view_started is None:
+        metrics.view_started = time.perf_counter()
+
+
+def _timed_serializer(method):
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        metrics = _current.get()
+        # вложенные вызовы учтены во внешнем
+        if metrics is None or metrics._in_serializer:
+            return method(self, *args, **kwargs)
+        metrics._in_serializer = True
+        start = time.perf_counter()
+        try:
+            return method(self, *args, **kwargs)
+        finally:
+            metrics.serializer_time += time.perf_counter() - start
+            metrics._in_serializer = False
+
+    return wrapper
+
+
+def time_serializers():
+    """Подключает замер времени к сериализаторам DRF (один раз)"""
+    global _serializers_timed
+    if _serializers_timed:
+        return
+    _serializers_timed = True
+    # у DRF нет хуков вокруг сериализации, поэтому методы оборачиваются
+    BaseSerializer.is_valid = _timed_serializer(BaseSerializer.is_valid)
+    BaseSerializer.data = property(_timed_serializer(BaseSerializer.data.fget))
+
+
+class InstrumentationMiddleware:
+    """Middleware замеров запроса с выводом в Server-Timing и лог"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.INSTRUMENTATION_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_tracking()
+        time_serializers()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        return self._finish(request, response, metrics)
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        return self._finish(request, response, metrics)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_started()
+
+    def _finish(self, request, response, metrics):
+        finished = time.perf_counter()
+        total = finished - metrics.started
+        if metrics.view_started is not None:
+            metrics.view_time = finished - metrics.view_started
+
+        response["Server-Timing"] = ", ".join(
+            (
+                f'db;dur={metrics.db_time * 1000:.2f};desc="{metrics.queries} queries"',
+                f"serializer;dur={metrics.serializer_time * 1000:.2f}",
+                f"view;dur={metrics.view_time * 1000:.2f}",
+                f"total;dur={total * 1000:.2f}",
+            )
+        )
+
+        repeated = metrics.repeated_queries(
+            settings.INSTRUMENTATION_N_PLUS_ONE_THRESHOLD
+        )
+        for shape, count in repeated:
+            logger.warning(
+                "Возможен N+1 в %s %s: запрос повторен %s раз: %s",
+                request.method,
+                request.path,
+                count,
+                shape,
+            )
+        logger.info(
+            json.dumps(
+                {
+                    "method": request.method,
+                    "path": request.path,
+                    "status": response.status_code,
+                    "queries": metrics.queries,
+                    "db_ms": round(metrics.db_time * 1000, 2),
+                    "serializer_ms": round(metrics.serializer_time * 1000, 2),
+                    "view_ms": round(metrics.view_time * 1000, 2),
+                    "total_ms": round(total * 1000, 2),
+                    "n_plus_one": len(repeated),
+                }
+            )
+        )
+        return response
+
+
+class QueryBudgetTestMixin:
+    """Проверки бюджета запросов к БД для TestCase"""
+
+    @contextmanager
+    def assertQueryBudget(self, max_queries, max_repeats=None, using=DEFAULT_DB_ALIAS):
+        """Не больше max_queries запросов и не больше max_repeats запросов одного вида.
+
+        max_repeats по умолчанию равен INSTRUMENTATION_N_PLUS_ONE_THRESHOLD.
+        """
+        if max_repeats is None:
+            max_repeats = settings.INSTRUMENTATION_N_PLUS_ONE_THRESHOLD
+        with CaptureQueriesContext(connections[using]) as captured:
+            yield captured
+
+        executed = [query["sql"] for query in captured.captured_queries]
+        listing = "\n".join(f"{i}. {sql}" for i, sql in enumerate(executed, 1))
+        self.assertLessEqual(
+            len(executed),
+            max_queries,
+            f"Выполнено {len(executed)} запросов при бюджете {max_queries}:\n{listing}",
+        )
+        shapes = Counter(sql_shape(sql) for sql in executed)
+        repeated = [(shape, n) for shape, n in shapes.items() if n > max_repeats]
+        self.assertFalse(
+            repeated, f"Запросы повторены больше {max_repeats} раз: {repeated}"
+        )
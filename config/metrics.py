@@ -0,0 +1,367 @@
+"""Метрики приложения в формате Prometheus.
+
+Счетчики и гистограммы хранятся отдельно для каждого потока, поэтому запись
+значения не требует блокировок, потоки объединяются только при сборе метрик.
+Значения завершившихся потоков при сборе переносятся в общий итог метрики.
+
+При запуске под gunicorn (config/gunicorn_conf.py) каждый воркер раз
+в METRICS_FLUSH_INTERVAL секунд записывает свои значения в файл каталога
+METRICS_DIR, а /metrics суммирует файлы всех воркеров. Значения завершившихся
+воркеров переносятся в общий архив, чтобы счетчики не уменьшались.
+
+/metrics доступен только с адресов METRICS_ALLOWED_NETWORKS или с заголовком
+Authorization: Bearer METRICS_TOKEN.
+"""
+
+import atexit
+import ipaddress
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.http import HttpResponse, HttpResponseForbidden
+from django.utils.crypto import constant_time_compare
+
+from config.instrumentation import (
+    end_request,
+    install_query_tracking,
+    start_request,
+    view_started,
+)
+
+ARCHIVE_FILE = "archive.json"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# все созданные метрики в порядке вывода
+registry = []
+
+
+class Metric:
+    """Базовый класс метрики с хранилищем значений на каждый поток"""
+
+    type = None
+
+    def __init__(self, name, documentation, labelnames=()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._local = threading.local()
+        # {поток: значения} живых потоков и итог завершившихся
+        self._stores = {}
+        self._retired = {}
+        self._lock = threading.Lock()
+        registry.append(self)
+
+    def _values(self):
+        try:
+            return self._local.values
+        except AttributeError:
+            values = self._local.values = {}
+            # блокировка нужна только при первой записи из нового потока
+            with self._lock:
+                self._stores[threading.current_thread()] = values
+            return values
+
+    def _merge(self, current, values):
+        raise NotImplementedError
+
+    def collect(self):
+        """Значения всех потоков процесса {метки: значение}"""
+        with self._lock:
+            # завершившийся поток больше не пишет в свои значения
+            for thread in [thread for thread in self._stores if not thread.is_alive()]:
+                for labels, values in self._stores.pop(thread).items():
+                    self._retired[labels] = self._merge(
+                        self._retired.get(labels), values
+                    )
+            stores = [self._retired, *self._stores.values()]
+        merged = {}
+        for store in stores:
+            for labels, values in list(store.items()):
+                merged[labels] = self._merge(merged.get(labels), values)
+        return merged
+
+    def reset(self):
+        self._local = threading.local()
+        self._stores = {}
+        self._retired = {}
+
+    def expose(self, samples):
+        lines = [
+            f"# HELP {self.name} {self.documentation}",
+            f"# TYPE {self.name} {self.type}",
+        ]
+        for labels, values in sorted(samples.items()):
+            lines.extend(
+                self._expose_sample(dict(zip(self.labelnames, labels)), values)
+            )
+        return lines
+
+
+class Counter(Metric):
+    type = "counter"
+
+    def inc(self, *labels, amount=1):
+        values = self._values()
+        values[labels] = values.get(labels, 0) + amount
+
+    def _merge(self, current, values):
+        return (current or 0) + values
+
+    def _expose_sample(self, labels, value):
+        yield f"{self.name}{_format_labels(labels)} {value}"
+
+
+class Histogram(Metric):
+    type = "histogram"
+
+    def __init__(self, name, documentation, labelnames=(), buckets=None):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets or settings.METRICS_LATENCY_BUCKETS))
+
+    def observe(self, value, *labels):
+        values = self._values()
+        slots = values.get(labels)
+        if slots is None:
+            # счетчики корзин, корзина +Inf, сумма, количество
+            slots = values[labels] = [0] * (len(self.buckets) + 3)
+        slots[bisect_left(self.buckets, value)] += 1
+        slots[-2] += value
+        slots[-1] += 1
+
+    def _merge(self, current, values):
+        if current is None:
+            return list(values)
+        return [a + b for a, b in zip(current, values)]
+
+    def _expose_sample(self, labels, slots):
+        cumulative = 0
+        for bound, count in zip((*self.buckets, "+Inf"), slots):
+            cumulative += count
+            bucket_labels = _format_labels({**labels, "le": bound})
+            yield f"{self.name}_bucket{bucket_labels} {cumulative}"
+        yield f"{self.name}_sum{_format_labels(labels)} {slots[-2]}"
+        yield f"{self.name}_count{_format_labels(labels)} {slots[-1]}"
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels):
+    if not labels:
+        return ""
+    pairs = ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return f"{{{pairs}}}"
+
+
+REQUEST_LATENCY = Histogram(
+    "http_request_duration_seconds",
+    "Время обработки запроса",
+    ("route", "method", "status"),
+)
+REQUEST_DB_TIME = Histogram(
+    "http_request_db_duration_seconds",
+    "Суммарное время запросов к БД за запрос",
+    ("route", "method"),
+)
+AUTH_CODES_ISSUED = Counter("auth_codes_issued_total", "Выдано кодов авторизации")
+AUTH_CODES_VERIFIED = Counter(
+    "auth_codes_verified_total", "Успешно проверено кодов авторизации"
+)
+AUTH_CODE_VERIFY_FAILURES = Counter(
+    "auth_code_verify_failures_total", "Отклонено неверных кодов авторизации"
+)
+
+
+def snapshot():
+    """Значения метрик текущего процесса {имя: [[метки, значение], ...]}"""
+    return {
+        metric.name: [
+            [list(labels), values] for labels, values in metric.collect().items()
+        ]
+        for metric in registry
+    }
+
+
+def _merge_snapshot(merged, data):
+    metrics = {metric.name: metric for metric in registry}
+    for name, samples in data.items():
+        metric = metrics.get(name)
+        if metric is None:
+            continue
+        target = merged.setdefault(name, {})
+        for labels, values in samples:
+            labels = tuple(labels)
+            target[labels] = metric._merge(target.get(labels), values)
+
+
+def _read(path):
+    try:
+        with open(path) as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write(path, data):
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(data, file)
+    os.replace(tmp_path, path)
+
+
+def _worker_path(pid):
+    return os.path.join(settings.METRICS_DIR, f"worker_{pid}.json")
+
+
+def flush():
+    """Записывает значения текущего процесса в файл воркера"""
+    if settings.METRICS_DIR:
+        _write(_worker_path(os.getpid()), snapshot())
+
+
+def collect():
+    """Значения метрик всех воркеров {имя: {метки: значение}}"""
+    merged = {}
+    if not settings.METRICS_DIR:
+        _merge_snapshot(merged, snapshot())
+        return merged
+
+    flush()
+    for name in os.listdir(settings.METRICS_DIR):
+        if name.endswith(".json"):
+            _merge_snapshot(merged, _read(os.path.join(settings.METRICS_DIR, name)))
+    return merged
+
+
+def render():
+    """Метрики в текстовом формате Prometheus"""
+    merged = collect()
+    lines = []
+    for metric in registry:
+        lines.extend(metric.expose(merged.get(metric.name, {})))
+    return "\n".join(lines) + "\n"
+
+
+def is_allowed(request):
+    """Проверяет доступ к /metrics по токену или адресу клиента"""
+    token = settings.METRICS_TOKEN
+    if token and constant_time_compare(
+        request.headers.get("Authorization", ""), f"Bearer {token}"
+    ):
+        return True
+    # X-Forwarded-For не учитывается: его может подставить клиент
+    try:
+        address = ipaddress.ip_address(request.META.get("REMOTE_ADDR", ""))
+    except ValueError:
+        return False
+    return any(
+        address in ipaddress.ip_network(network)
+        for network in settings.METRICS_ALLOWED_NETWORKS
+    )
+
+
+def metrics_view(request):
+    """Представление /metrics для Prometheus"""
+    if not is_allowed(request):
+        return HttpResponseForbidden()
+    return HttpResponse(render(), content_type=CONTENT_TYPE)
+
+
+def start_worker():
+    """Сбрасывает унаследованные от мастера значения и запускает запись в файл"""
+    for metric in registry:
+        metric.reset()
+    if not settings.METRICS_DIR:
+        return
+
+    def run():
+        while True:
+            time.sleep(settings.METRICS_FLUSH_INTERVAL)
+            flush()
+
+    threading.Thread(target=run, name="metrics-flush", daemon=True).start()
+    atexit.register(flush)
+
+
+def clear_directory():
+    """Очищает каталог METRICS_DIR при запуске сервера"""
+    os.makedirs(settings.METRICS_DIR, exist_ok=True)
+    for name in os.listdir(settings.METRICS_DIR):
+        os.remove(os.path.join(settings.METRICS_DIR, name))
+
+
+def mark_process_dead(pid):
+    """Переносит значения завершившегося воркера в архив"""
+    path = _worker_path(pid)
+    if not os.path.exists(path):
+        return
+    archive_path = os.path.join(settings.METRICS_DIR, ARCHIVE_FILE)
+    merged = {}
+    _merge_snapshot(merged, _read(archive_path))
+    _merge_snapshot(merged, _read(path))
+    _write(
+        archive_path,
+        {
+            name: [[list(labels), values] for labels, values in samples.items()]
+            for name, samples in merged.items()
+        },
+    )
+    os.remove(path)
+
+
+class MetricsMiddleware:
+    """Middleware метрик: время обработки и время запросов к БД по маршрутам"""
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        if not settings.METRICS_ENABLED:
+            raise MiddlewareNotUsed
+        self.get_response = get_response
+        self.async_mode = iscoroutinefunction(get_response)
+        if self.async_mode:
+            markcoroutinefunction(self)
+        install_query_tracking()
+
+    def __call__(self, request):
+        if self.async_mode:
+            return self.__acall__(request)
+        metrics, token = start_request()
+        try:
+            response = self.get_response(request)
+        finally:
+            end_request(token)
+        self._observe(request, response, metrics)
+        return response
+
+    async def __acall__(self, request):
+        metrics, token = start_request()
+        try:
+            response = await self.get_response(request)
+        finally:
+            end_request(token)
+        self._observe(request, response, metrics)
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_started()
+
+    def _observe(self, request, response, metrics):
+        match = request.resolver_match
+        # шаблон маршрута, а не путь, чтобы id не порождали новые ряды
+        route = match.route if match is not None else "unmatched"
+        REQUEST_LATENCY.observe(
+            time.perf_counter() - metrics.started,
+            route,
+            request.method,
+            str(response.status_code),
+        )
+        REQUEST_DB_TIME.observe(metrics.db_time, route, request.method)
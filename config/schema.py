@@ -0,0 +1,96 @@
+"""OpenAPI схема для swagger/redoc, генерируемая один раз.
+
+Схема создается командой generate_schema при сборке или при первом запросе
+и отдается из памяти с ETag, yaml получается из того же json документа.
+Страницы swagger/redoc схему не строят, она загружается ими по ссылке.
+При DEBUG=True схема создается на каждый запрос, чтобы отражать изменения в коде.
+"""
+
+import hashlib
+import json
+import threading
+
+from django.conf import settings
+from django.http import HttpResponse, HttpResponseNotModified
+from django.utils.http import parse_etags, quote_etag
+from drf_yasg import openapi
+from drf_yasg.codecs import OpenAPICodecJson, OpenAPICodecYaml, yaml_dump
+from drf_yasg.renderers import SwaggerYAMLRenderer, _SpecRenderer
+from drf_yasg.views import get_schema_view
+from rest_framework import permissions
+from rest_framework.response import Response
+
+CODECS = {"json": OpenAPICodecJson, "yaml": OpenAPICodecYaml}
+
+_documents = {}
+_lock = threading.RLock()
+
+API_INFO = openapi.Info(
+    title="Snippets API",
+    default_version="v1",
+    description="Test description",
+    terms_of_service="https://www.google.com/policies/terms/",
+    contact=openapi.Contact(email="contact@snippets.local"),
+    license=openapi.License(name="BSD License"),
+)
+
+schema_view = get_schema_view(
+    API_INFO,
+    public=True,
+    permission_classes=(permissions.AllowAny,),
+)
+
+
+def generate_schema(file_format="json"):
+    """Создает схему по всем представлениям проекта, возвращает байты документа"""
+    generator = schema_view.generator_class(API_INFO)
+    schema = generator.get_schema(request=None, public=True)
+    return CODECS[file_format](validators=[]).encode(schema)
+
+
+def _load(file_format):
+    if file_format == "yaml":
+        content, _ = get_schema_document("json")
+        return yaml_dump(json.loads(content), binary=True)
+    if settings.OPENAPI_SCHEMA_PATH.is_file():
+        return settings.OPENAPI_SCHEMA_PATH.read_bytes()
+    return generate_schema(file_format)
+
+
+def get_schema_document(file_format="json"):
+    """Возвращает (документ, etag) из памяти, файла или новой генерации"""
+    if settings.DEBUG:
+        content = generate_schema(file_format)
+        return content, hashlib.md5(content).hexdigest()
+
+    document = _documents.get(file_format)
+    if document is None:
+        with _lock:
+            document = _documents.get(file_format)
+            if document is None:
+                content = _load(file_format)
+                document = content, hashlib.md5(content).hexdigest()
+                _documents[file_format] = document
+    return document
+
+
+class CachedSchemaView(schema_view):
+    """Представление схемы: документ отдается готовым, страницы UI - без схемы"""
+
+    def get(self, request, version="", format=None):
+        renderer = request.accepted_renderer
+        if not isinstance(renderer, _SpecRenderer):
+            # шаблону UI нужны только заголовок и версия
+            version = request.version or version or ""
+            return Response(
+                openapi.Swagger(info=API_INFO, _prefix="/", _version=version)
+            )
+
+        file_format = "yaml" if isinstance(renderer, SwaggerYAMLRenderer) else "json"
+        content, etag = get_schema_document(file_format)
+        if quote_etag(etag) in parse_etags(request.headers.get("If-None-Match", "")):
+            response = HttpResponseNotModified()
+        else:
+            response = HttpResponse(content, content_type=renderer.media_type)
+        response["ETag"] = quote_etag(etag)
+        return response
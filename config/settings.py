@@ -14,10 +14,10 @@ load_dotenv(dotenv_path=BASE_DIR.joinpath(".env"))
 SECRET_KEY = os.getenv("SECRET_KEY")
 
 
-DEBUG = True
+DEBUG = os.getenv("DEBUG", "True") == "True"
 
 
-ALLOWED_HOSTS = []
+ALLOWED_HOSTS = [host for host in os.getenv("ALLOWED_HOSTS", "").split(",") if host]
 
 
 INSTALLED_APPS = [
@@ -36,6 +36,8 @@ INSTALLED_APPS = [
 
 
 MIDDLEWARE = [
+    "config.instrumentation.InstrumentationMiddleware",
+    "config.metrics.MetricsMiddleware",
     "django.middleware.security.SecurityMiddleware",
     "django.contrib.sessions.middleware.SessionMiddleware",
     "django.middleware.common.CommonMiddleware",
@@ -69,6 +71,10 @@ TEMPLATES = [
 
 WSGI_APPLICATION = "config.wsgi.application"
 
+# Под ASGI соединения открываются в потоках sync_to_async и не закрываются
+# по окончании запроса, поэтому постоянные соединения по умолчанию отключены
+ASGI_MODE = os.getenv("SERVER_MODE", "wsgi") == "asgi"
+
 DATABASES = {
     "default": {
         "ENGINE": "django.db.backends.postgresql",
@@ -77,9 +83,29 @@ DATABASES = {
         "PASSWORD": os.getenv("DB_PASSWORD"),
         "HOST": os.getenv("DB_HOST"),
         "PORT": os.getenv("DB_PORT"),
+        "CONN_MAX_AGE": int(os.getenv("DB_CONN_MAX_AGE") or (0 if ASGI_MODE else 60)),
+        "CONN_HEALTH_CHECKS": os.getenv("DB_CONN_HEALTH_CHECKS", "True") == "True",
     }
 }
 
+# Пул соединений psycopg 3 (poetry install --extras pool),
+# несовместим с постоянными соединениями
+if os.getenv("DB_POOL", "False") == "True":
+    DATABASES["default"]["CONN_MAX_AGE"] = 0
+    DATABASES["default"]["OPTIONS"] = {
+        "pool": {
+            "min_size": int(os.getenv("DB_POOL_MIN_SIZE", 2)),
+            "max_size": int(os.getenv("DB_POOL_MAX_SIZE", 10)),
+            "timeout": float(os.getenv("DB_POOL_TIMEOUT", 10)),
+        }
+    }
+
+
+AUTHENTICATION_BACKENDS = [
+    "users.backends.PhoneCodeBackend",
+    "django.contrib.auth.backends.ModelBackend",
+]
+
 
 AUTH_PASSWORD_VALIDATORS = [
     {
@@ -105,17 +131,32 @@ USE_TZ = True
 
 STATIC_URL = "static/"
 MEDIA_URL = "media/"
-MEDIA_ROOT = (BASE_DIR / "media",)
+MEDIA_ROOT = BASE_DIR / "media"
+
+# Каталог для загруженных файлов импорта пользователей до их обработки в фоне
+USER_IMPORT_DIR = os.getenv("USER_IMPORT_DIR") or BASE_DIR / "imports"
 
 
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 AUTH_USER_MODEL = "users.User"
 
 
+# True - права проверяются по признакам из токена без загрузки пользователя из БД
+JWT_STATELESS_AUTH = os.getenv("JWT_STATELESS_AUTH", "True") == "True"
+
 REST_FRAMEWORK = {
     "DEFAULT_AUTHENTICATION_CLASSES": (
-        "rest_framework_simplejwt.authentication.JWTAuthentication",
-    )
+        (
+            "users.authentication.ClaimsJWTAuthentication"
+            if JWT_STATELESS_AUTH
+            else "users.authentication.UserJWTAuthentication"
+        ),
+    ),
+    # ограничения частоты запросов к /api/users/login/ (отдельно для POST и PUT)
+    "DEFAULT_THROTTLE_RATES": {
+        "login_phone": os.getenv("LOGIN_PHONE_RATE", "5/min"),
+        "login_ip": os.getenv("LOGIN_IP_RATE", "100/min"),
+    },
 }
 
 
@@ -123,6 +164,8 @@ SIMPLE_JWT = {
     "ACCESS_TOKEN_LIFETIME": timedelta(minutes=15),
     "REFRESH_TOKEN_LIFETIME": timedelta(days=1),
     "ROTATE_REFRESH_TOKENS": False,
+    "TOKEN_OBTAIN_SERIALIZER": "users.serializers.UserTokenObtainPairSerializer",
+    "TOKEN_REFRESH_SERIALIZER": "users.serializers.UserTokenRefreshSerializer",
 }
 
 
@@ -151,6 +194,119 @@ SWAGGER_SETTINGS = {
     "JSON_EDITOR": True,
 }
 
+# Файл OpenAPI схемы, создаваемый командой generate_schema
+OPENAPI_SCHEMA_PATH = Path(
+    os.getenv("OPENAPI_SCHEMA_PATH") or BASE_DIR / "openapi.json"
+)
+
+
+CACHES = {
+    "default": {
+        "BACKEND": os.getenv(
+            "CACHE_BACKEND", "django.core.cache.backends.locmem.LocMemCache"
+        ),
+        "LOCATION": os.getenv("CACHE_LOCATION", ""),
+    }
+}
+
+
+# Замеры запросов (Server-Timing, лог) и порог повторов одного SQL для отметки N+1
+INSTRUMENTATION_ENABLED = os.getenv("INSTRUMENTATION_ENABLED", "False") == "True"
+INSTRUMENTATION_N_PLUS_ONE_THRESHOLD = int(
+    os.getenv("INSTRUMENTATION_N_PLUS_ONE_THRESHOLD", 10)
+)
+
+
+# Метрики Prometheus (/metrics): сети и токен, которым доступен /metrics, каталог
+# файлов воркеров gunicorn, период их записи и границы корзин гистограмм в секундах
+METRICS_ENABLED = os.getenv("METRICS_ENABLED", "True") == "True"
+METRICS_ALLOWED_NETWORKS = [
+    network.strip()
+    for network in os.getenv("METRICS_ALLOWED_NETWORKS", "127.0.0.1,::1").split(",")
+    if network.strip()
+]
+METRICS_TOKEN = os.getenv("METRICS_TOKEN", "")
+METRICS_DIR = os.getenv("METRICS_DIR", "")
+METRICS_FLUSH_INTERVAL = float(os.getenv("METRICS_FLUSH_INTERVAL", 5))
+METRICS_LATENCY_BUCKETS = [
+    float(bucket)
+    for bucket in os.getenv(
+        "METRICS_LATENCY_BUCKETS", "0.005,0.01,0.025,0.05,0.1,0.25,0.5,1,2.5,5,10"
+    ).split(",")
+]
+
+
+# Кеш счетчиков ограничения частоты запросов
+THROTTLE_CACHE = "default"
+
+# Кеш профилей пользователей
+PROFILE_CACHE = "default"
+PROFILE_CACHE_TIMEOUT = int(os.getenv("PROFILE_CACHE_TIMEOUT", 3600))
+
+
+# Админка: с какой оценки числа строк не выполнять точный COUNT(*), сколько
+# секунд кешировать долю строк без помеченных удаленными и список городов для фильтра
+ADMIN_ESTIMATED_COUNT_THRESHOLD = int(
+    os.getenv("ADMIN_ESTIMATED_COUNT_THRESHOLD", 100000)
+)
+ADMIN_ESTIMATED_RATIO_CACHE_TIMEOUT = int(
+    os.getenv("ADMIN_ESTIMATED_RATIO_CACHE_TIMEOUT", 3600)
+)
+ADMIN_CITY_FILTER_CACHE_TIMEOUT = int(os.getenv("ADMIN_CITY_FILTER_CACHE_TIMEOUT", 600))
+
+
+# Отзыв токенов: общий для процессов кеш фильтра и журнала отзывов, период
+# обновления фильтра в процессах (задержка вступления отзыва в силу), расчетное
+# число записей и доля ложных срабатываний, число отзывов в журнале до фоновой
+# перестройки фильтра и время хранения записей журнала
+TOKEN_REVOCATION_CACHE = "default"
+TOKEN_REVOCATION_FILTER_REFRESH = float(os.getenv("TOKEN_REVOCATION_FILTER_REFRESH", 5))
+TOKEN_REVOCATION_FILTER_CAPACITY = int(
+    os.getenv("TOKEN_REVOCATION_FILTER_CAPACITY", 100000)
+)
+TOKEN_REVOCATION_FILTER_ERROR_RATE = float(
+    os.getenv("TOKEN_REVOCATION_FILTER_ERROR_RATE", 0.001)
+)
+TOKEN_REVOCATION_REBUILD_DELTAS = int(
+    os.getenv("TOKEN_REVOCATION_REBUILD_DELTAS", 1000)
+)
+TOKEN_REVOCATION_DELTA_TIMEOUT = int(os.getenv("TOKEN_REVOCATION_DELTA_TIMEOUT", 86400))
+
+# Коды авторизации
+AUTH_CODE_TTL = timedelta(seconds=int(os.getenv("AUTH_CODE_TTL", 300)))
+AUTH_CODE_STORE = os.getenv("AUTH_CODE_STORE", "users.code_store.ModelCodeStore")
+AUTH_CODE_CACHE = "default"
+AUTH_CODE_MAX_ATTEMPTS = int(os.getenv("AUTH_CODE_MAX_ATTEMPTS", 5))
+
+# Номера телефонов: регион для номеров без кода страны и разрешенные коды стран
+PHONE_DEFAULT_REGION = os.getenv("PHONE_DEFAULT_REGION", "RU")
+PHONE_ALLOWED_COUNTRY_CODES = [
+    int(code)
+    for code in os.getenv("PHONE_ALLOWED_COUNTRY_CODES", "7").split(",")
+    if code
+]
+
+# Invite коды
+INVITE_CODE_MAX_ATTEMPTS = int(os.getenv("INVITE_CODE_MAX_ATTEMPTS", 5))
+INVITE_CODE_POOL_ENABLED = os.getenv("INVITE_CODE_POOL_ENABLED", "False") == "True"
+INVITE_CODE_POOL_SIZE = int(os.getenv("INVITE_CODE_POOL_SIZE", 10000))
+
+# Аватары: размеры миниатюр WebP в пикселях и ограничение размера загрузки
+AVATAR_THUMBNAIL_SIZES = [
+    int(size) for size in os.getenv("AVATAR_THUMBNAIL_SIZES", "64,256").split(",")
+]
+AVATAR_WEBP_QUALITY = int(os.getenv("AVATAR_WEBP_QUALITY", 80))
+AVATAR_MAX_UPLOAD_SIZE = int(os.getenv("AVATAR_MAX_UPLOAD_SIZE", 10 * 1024 * 1024))
+
+# Доставка кодов авторизации
+SMS_BACKEND = os.getenv("SMS_BACKEND", "users.delivery.ConsoleSMSBackend")
+SMS_DISPATCHER = os.getenv("SMS_DISPATCHER", "users.delivery.ThreadPoolDispatcher")
+SMS_OUTBOX_MAX_ATTEMPTS = int(os.getenv("SMS_OUTBOX_MAX_ATTEMPTS", 5))
+SMS_OUTBOX_CLAIM_TIMEOUT = timedelta(
+    seconds=int(os.getenv("SMS_OUTBOX_CLAIM_TIMEOUT", 300))
+)
+WORKER_POOL_SIZE = int(os.getenv("WORKER_POOL_SIZE", 4))
+
 
 CORS_ALLOW_ALL_ORIGINS = True
 CORS_ALLOW_METHODS = [
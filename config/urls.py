@@ -1,33 +1,24 @@
 from django.conf.urls.static import static
 from django.contrib import admin
-from django.urls import include, path
-from drf_yasg import openapi
-from drf_yasg.views import get_schema_view
-from rest_framework import permissions
+from django.urls import include, path, re_path
 
 from config import settings
-
-schema_view = get_schema_view(
-    openapi.Info(
-        title="Snippets API",
-        default_version="v1",
-        description="Test description",
-        terms_of_service="https://www.google.com/policies/terms/",
-        contact=openapi.Contact(email="contact@snippets.local"),
-        license=openapi.License(name="BSD License"),
-    ),
-    public=True,
-    permission_classes=(permissions.AllowAny,),
-)
-
+from config.metrics import metrics_view
+from config.schema import CachedSchemaView
 
 urlpatterns = [
     path("admin/", admin.site.urls),
     path("api/users/", include("users.urls", namespace="api_users")),
+    re_path(
+        r"^swagger\.(?P<format>json|yaml)$",
+        CachedSchemaView.without_ui(),
+        name="schema-json",
+    ),
     path(
         "swagger/",
-        schema_view.with_ui("swagger", cache_timeout=0),
+        CachedSchemaView.with_ui("swagger"),
         name="schema-swagger-ui",
     ),
-    path("redoc/", schema_view.with_ui("redoc", cache_timeout=0), name="schema-redoc"),
+    path("redoc/", CachedSchemaView.with_ui("redoc"), name="schema-redoc"),
+    path("metrics", metrics_view, name="metrics"),
 ] + static(settings.MEDIA_URL, document_root=settings.MEDIA_ROOT)
@@ -1,9 +1,125 @@
+import datetime
+
+from django.conf import settings
 from django.contrib import admin
+from django.core.cache import cache
+from django.db.models import Max, Min
+from django.utils import timezone
+
+from users.models import AuthCode, AuthCodeQuerySet, User
+from users.paginators import EstimatedCountPaginator
+from users.phones import normalize_phone_or_none, normalize_phone_prefix
+
+CITY_FILTER_CACHE_KEY = "admin_user_cities"
+CITY_FILTER_LIMIT = 200
+
 
-from users.models import User
+class CityListFilter(admin.SimpleListFilter):
+    """Фильтр по городу со списком городов из кеша вместо DISTINCT на каждый показ"""
+
+    title = "Город"
+    parameter_name = "city"
+
+    def lookups(self, request, model_admin):
+        cities = cache.get(CITY_FILTER_CACHE_KEY)
+        if cities is None:
+            cities = list(
+                User.objects.exclude(city__isnull=True)
+                .exclude(city="")
+                .order_by("city")
+                .values_list("city", flat=True)
+                .distinct()[:CITY_FILTER_LIMIT]
+            )
+            cache.set(
+                CITY_FILTER_CACHE_KEY, cities, settings.ADMIN_CITY_FILTER_CACHE_TIMEOUT
+            )
+        return [(city, city) for city in cities]
+
+    def queryset(self, request, queryset):
+        if self.value():
+            return queryset.filter(city=self.value())
+        return queryset
 
 
 @admin.register(User)
 class UserAdmin(admin.ModelAdmin):
     list_display = ("pk", "phone", "email", "telegram_id", "city", "is_active")
-    list_filter = ("city", "is_active")
+    list_filter = (CityListFilter, "is_active")
+    ordering = ("-pk",)
+    search_fields = ("=phone",)
+    search_help_text = "Номер телефона или его начало, например +7905 или 8905"
+    autocomplete_fields = ("referrals",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+    show_facets = admin.ShowFacets.NEVER
+
+    def get_search_results(self, request, queryset, search_term):
+        # поиск по префиксу номера использует индекс по phone (LIKE '+7905%'),
+        # в отличие от icontains по умолчанию
+        term = search_term.strip()
+        if not term:
+            return queryset, False
+        phone = normalize_phone_or_none(term)
+        if phone is not None:
+            return queryset.filter(phone=phone), False
+        prefix = normalize_phone_prefix(term)
+        if prefix is None:
+            return queryset.none(), False
+        return queryset.filter(phone__startswith=prefix), False
+
+
+class CalendarDatesQuerySet(AuthCodeQuerySet):
+    """QuerySet, в котором даты для date_hierarchy строятся по календарю.
+
+    Вместо DISTINCT по всем строкам периода берутся первая и последняя дата
+    (два обращения к индексу), между ними перечисляются все дни, месяцы или годы.
+    """
+
+    def datetimes(self, field_name, kind, order="ASC", tzinfo=None):
+        bounds = self.aggregate(first=Min(field_name), last=Max(field_name))
+        if bounds["first"] is None:
+            return []
+        first = timezone.localtime(bounds["first"], tzinfo).date()
+        last = timezone.localtime(bounds["last"], tzinfo).date()
+
+        if kind == "year":
+            dates = [
+                datetime.date(year, 1, 1) for year in range(first.year, last.year + 1)
+            ]
+        elif kind == "month":
+            dates = [
+                datetime.date(month // 12, month % 12 + 1, 1)
+                for month in range(
+                    first.year * 12 + first.month - 1, last.year * 12 + last.month
+                )
+            ]
+        else:
+            dates = [
+                first + datetime.timedelta(days=offset)
+                for offset in range((last - first).days + 1)
+            ]
+        if order == "DESC":
+            dates.reverse()
+        return [
+            timezone.make_aware(
+                datetime.datetime.combine(date, datetime.time()), tzinfo
+            )
+            for date in dates
+        ]
+
+
+@admin.register(AuthCode)
+class AuthCodeAdmin(admin.ModelAdmin):
+    list_display = ("pk", "user", "code", "created_at")
+    list_select_related = ("user",)
+    raw_id_fields = ("user",)
+    date_hierarchy = "created_at"
+    ordering = ("-created_at",)
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_queryset(self, request):
+        queryset = super().get_queryset(request)
+        return CalendarDatesQuerySet(
+            model=queryset.model, query=queryset.query, using=queryset.db
+        )
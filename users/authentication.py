@@ -0,0 +1,49 @@
+from django.utils.functional import cached_property
+from rest_framework_simplejwt.authentication import (
+    JWTAuthentication,
+    JWTStatelessUserAuthentication,
+)
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from rest_framework_simplejwt.models import TokenUser
+
+from users.revocation import is_revoked
+from users.tokens import USER_TOKEN_CLAIMS
+
+
+class ClaimsTokenUser(TokenUser):
+    """Пользователь, восстановленный из признаков токена"""
+
+    @cached_property
+    def is_active(self):
+        return self.token.get("is_active", False)
+
+
+class TokenRevocationMixin:
+    """Отклоняет отозванные токены, для неотозванных проверка обходится без БД"""
+
+    def get_validated_token(self, raw_token):
+        validated_token = super().get_validated_token(raw_token)
+        if is_revoked(validated_token):
+            raise InvalidToken("Токен отозван.", code="token_revoked")
+        return validated_token
+
+
+class UserJWTAuthentication(TokenRevocationMixin, JWTAuthentication):
+    """Аутентификация по JWT с загрузкой пользователя из БД и проверкой отзыва"""
+
+
+class ClaimsJWTAuthentication(TokenRevocationMixin, JWTStatelessUserAuthentication):
+    """Аутентификация по JWT без загрузки пользователя из БД.
+
+    Токены без признаков пользователя (выданные до их появления)
+    проверяются по БД, как в JWTAuthentication.
+    """
+
+    def get_user(self, validated_token):
+        if not all(claim in validated_token for claim in USER_TOKEN_CLAIMS):
+            return JWTAuthentication.get_user(self, validated_token)
+
+        user = ClaimsTokenUser(validated_token)
+        if not user.is_active:
+            raise AuthenticationFailed("Пользователь неактивен.", code="user_inactive")
+        return user
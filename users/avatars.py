@@ -0,0 +1,85 @@
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+from users.models import User
+from users.profile_cache import invalidate_profile
+from users.workers import submit_on_commit
+
+logger = logging.getLogger(__name__)
+
+AVATAR_FORMATS = ("JPEG", "PNG", "WEBP", "GIF")
+THUMBNAILS_DIR = "users/thumbnails"
+
+
+def thumbnail_name(name, size):
+    """Имя файла миниатюры аватара заданного размера"""
+    base = os.path.splitext(os.path.basename(name))[0]
+    return f"{THUMBNAILS_DIR}/{base}_{size}.webp"
+
+
+def render_thumbnail(image, size):
+    """Квадратная миниатюра в формате WebP"""
+    thumbnail = ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS)
+    buffer = io.BytesIO()
+    thumbnail.save(buffer, "WEBP", quality=settings.AVATAR_WEBP_QUALITY, method=4)
+    return buffer.getvalue()
+
+
+def process_avatar(user_pk, name, stale_thumbnails=()):
+    """Создает миниатюры аватара и сохраняет их имена в профиле.
+
+    Если аватар успел смениться, созданные миниатюры удаляются.
+    """
+    delete_files(stale_thumbnails)
+
+    with default_storage.open(name) as file:
+        image = Image.open(file)
+        image.draft("RGB", (max(settings.AVATAR_THUMBNAIL_SIZES),) * 2)
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("RGBA" if image.mode in ("RGBA", "LA", "P") else "RGB")
+
+        thumbnails = {}
+        for size in settings.AVATAR_THUMBNAIL_SIZES:
+            thumbnail = thumbnail_name(name, size)
+            default_storage.delete(thumbnail)
+            thumbnails[str(size)] = default_storage.save(
+                thumbnail, ContentFile(render_thumbnail(image, size))
+            )
+
+    if User.objects.filter(pk=user_pk, avatar=name).update(
+        avatar_thumbnails=thumbnails
+    ):
+        # update() не отправляет post_save
+        invalidate_profile(user_pk)
+    else:
+        delete_files(thumbnails.values())
+    return thumbnails
+
+
+def delete_files(names):
+    for name in names:
+        default_storage.delete(name)
+
+
+def schedule_avatar_processing(user, stale_thumbnails=()):
+    """Ставит обработку аватара в пул фоновых потоков после фиксации транзакции"""
+    stale_thumbnails = list(stale_thumbnails)
+    if user.avatar:
+        submit_on_commit(process_avatar, user.pk, user.avatar.name, stale_thumbnails)
+    elif stale_thumbnails:
+        submit_on_commit(delete_files, stale_thumbnails)
+
+
+def avatar_thumbnail_urls(user, request=None):
+    """Адреса готовых миниатюр аватара по размерам"""
+    urls = {}
+    for size, name in (user.avatar_thumbnails or {}).items():
+        url = default_storage.url(name)
+        urls[size] = request.build_absolute_uri(url) if request else url
+    return urls
@@ -0,0 +1,30 @@
+import re
+
+from django.contrib.auth.backends import ModelBackend
+from django.core.exceptions import PermissionDenied
+
+from config.metrics import AUTH_CODE_VERIFY_FAILURES, AUTH_CODES_VERIFIED
+from users.code_store import get_code_store
+
+AUTH_CODE_RE = re.compile(r"^\d{4}$")
+
+
+class PhoneCodeBackend(ModelBackend):
+    """Аутентификация по номеру телефона и одноразовому коду авторизации.
+
+    Код передается в поле password (как в token/). Неверный код завершает
+    аутентификацию без перехода к ModelBackend и его хешированию пароля.
+    """
+
+    def authenticate(self, request, phone=None, password=None, **kwargs):
+        if phone is None or password is None or not AUTH_CODE_RE.match(password):
+            return None
+
+        user = get_code_store().verify(phone, password)
+        if user is None:
+            AUTH_CODE_VERIFY_FAILURES.inc()
+            raise PermissionDenied
+        AUTH_CODES_VERIFIED.inc()
+        if not self.user_can_authenticate(user):
+            raise PermissionDenied
+        return user
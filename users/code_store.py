@@ -0,0 +1,148 @@
+import functools
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+from django.utils.module_loading import import_string
+
+from users.models import AuthCode, User
+
+
+class BaseCodeStore:
+    """Базовый класс хранилища одноразовых кодов авторизации"""
+
+    def issue(self, user, code):
+        """Сохраняет новый код для пользователя"""
+        raise NotImplementedError
+
+    def verify(self, phone, code):
+        """Погашает код, возвращает пользователя или None"""
+        raise NotImplementedError
+
+    async def aissue(self, user, code):
+        raise NotImplementedError
+
+    async def averify(self, phone, code):
+        raise NotImplementedError
+
+
+class ModelCodeStore(BaseCodeStore):
+    """Хранилище кодов в таблице AuthCode.
+
+    Неверный код увеличивает счетчик попыток действующих кодов номера,
+    после AUTH_CODE_MAX_ATTEMPTS неверных попыток коды не принимаются.
+    """
+
+    def _active(self, phone):
+        return AuthCode.objects.active().filter(
+            user__phone=phone, attempts__lt=settings.AUTH_CODE_MAX_ATTEMPTS
+        )
+
+    def _lookup(self, phone, code):
+        return (
+            self._active(phone)
+            .filter(code=code)
+            .select_related("user")
+            .order_by("-created_at")
+        )
+
+    def issue(self, user, code):
+        AuthCode.objects.create(user=user, code=code)
+
+    def verify(self, phone, code):
+        auth_code_obj = self._lookup(phone, code).first()
+        if not auth_code_obj:
+            self._active(phone).update(attempts=F("attempts") + 1)
+            return None
+        # код погашает только один из конкурирующих запросов
+        if not AuthCode.objects.filter(pk=auth_code_obj.pk).delete()[0]:
+            return None
+        return auth_code_obj.user
+
+    async def aissue(self, user, code):
+        await AuthCode.objects.acreate(user=user, code=code)
+
+    async def averify(self, phone, code):
+        auth_code_obj = await self._lookup(phone, code).afirst()
+        if not auth_code_obj:
+            await self._active(phone).aupdate(attempts=F("attempts") + 1)
+            return None
+        if not (await AuthCode.objects.filter(pk=auth_code_obj.pk).adelete())[0]:
+            return None
+        return auth_code_obj.user
+
+
+class CacheCodeStore(BaseCodeStore):
+    """Хранилище кодов в кеше Django с TTL и счетчиком попыток.
+
+    Для номера хранится только последний выданный код. Код погашается удалением
+    ключа: cache.delete() возвращает True только одному из конкурирующих запросов.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.AUTH_CODE_CACHE]
+
+    @property
+    def timeout(self):
+        return settings.AUTH_CODE_TTL.total_seconds()
+
+    def _keys(self, phone):
+        return f"auth_code:{phone}", f"auth_code_attempts:{phone}"
+
+    def _check(self, entry, attempts, code):
+        return attempts <= settings.AUTH_CODE_MAX_ATTEMPTS and entry["code"] == code
+
+    def issue(self, user, code):
+        key, attempts_key = self._keys(user.phone)
+        self.cache.set(key, {"code": code, "user_id": user.pk}, self.timeout)
+        self.cache.delete(attempts_key)
+
+    def verify(self, phone, code):
+        key, attempts_key = self._keys(phone)
+        entry = self.cache.get(key)
+        if entry is None:
+            return None
+
+        self.cache.add(attempts_key, 0, self.timeout)
+        try:
+            attempts = self.cache.incr(attempts_key)
+        except ValueError:  # счетчик истек вместе с кодом
+            return None
+        if not self._check(entry, attempts, code) or not self.cache.delete(key):
+            return None
+
+        self.cache.delete(attempts_key)
+        return User.objects.filter(pk=entry["user_id"]).first()
+
+    async def aissue(self, user, code):
+        key, attempts_key = self._keys(user.phone)
+        await self.cache.aset(key, {"code": code, "user_id": user.pk}, self.timeout)
+        await self.cache.adelete(attempts_key)
+
+    async def averify(self, phone, code):
+        key, attempts_key = self._keys(phone)
+        entry = await self.cache.aget(key)
+        if entry is None:
+            return None
+
+        await self.cache.aadd(attempts_key, 0, self.timeout)
+        try:
+            attempts = await self.cache.aincr(attempts_key)
+        except ValueError:
+            return None
+        if not self._check(entry, attempts, code) or not await self.cache.adelete(key):
+            return None
+
+        await self.cache.adelete(attempts_key)
+        return await User.objects.filter(pk=entry["user_id"]).afirst()
+
+
+@functools.lru_cache(maxsize=None)
+def _load(path):
+    return import_string(path)()
+
+
+def get_code_store():
+    """Возвращает хранилище, указанное в настройке AUTH_CODE_STORE"""
+    return _load(settings.AUTH_CODE_STORE)
@@ -0,0 +1,185 @@
+import asyncio
+import functools
+import logging
+import sys
+
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import connection, transaction
+from django.db.models import F
+from django.utils.module_loading import import_string
+from django.utils.timezone import now
+
+from users.workers import get_executor, submit, submit_on_commit
+
+logger = logging.getLogger(__name__)
+
+# Сообщения, отправленные через LocMemSMSBackend (аналог django.core.mail.outbox)
+outbox = []
+
+
+class BaseSMSBackend:
+    """Базовый класс шлюза для отправки SMS"""
+
+    def send(self, phone, message):
+        raise NotImplementedError
+
+    async def asend(self, phone, message):
+        # отдельный пул WORKER_POOL_SIZE, а не общий executor цикла событий,
+        # чтобы отправка не стояла в очереди за остальными sync_to_async
+        await asyncio.wrap_future(get_executor().submit(self.send, phone, message))
+
+
+class ConsoleSMSBackend(BaseSMSBackend):
+    """Шлюз для разработки: выводит SMS в консоль"""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+
+    def send(self, phone, message):
+        self.stream.write(f"SMS для {phone}: {message}\n")
+        self.stream.flush()
+
+
+class LocMemSMSBackend(BaseSMSBackend):
+    """Локальный фейковый шлюз для тестов: складывает SMS в users.delivery.outbox"""
+
+    def send(self, phone, message):
+        outbox.append({"phone": phone, "message": message})
+
+
+class BaseDispatcher:
+    """Базовый класс диспетчера доставки SMS"""
+
+    def dispatch(self, phone, message):
+        raise NotImplementedError
+
+    async def adispatch(self, phone, message):
+        await sync_to_async(self.dispatch)(phone, message)
+
+
+class SyncDispatcher(BaseDispatcher):
+    """Отправляет SMS сразу в потоке запроса"""
+
+    def dispatch(self, phone, message):
+        send_sms(phone, message)
+
+    async def adispatch(self, phone, message):
+        await get_sms_backend().asend(phone, message)
+
+
+class ThreadPoolDispatcher(BaseDispatcher):
+    """Отправляет SMS из пула фоновых потоков после фиксации транзакции"""
+
+    def dispatch(self, phone, message):
+        submit_on_commit(send_sms, phone, message)
+
+    async def adispatch(self, phone, message):
+        # асинхронные представления работают в режиме autocommit
+        submit(send_sms, phone, message)
+
+
+class OutboxDispatcher(BaseDispatcher):
+    """Записывает SMS в таблицу исходящих, отправкой занимается send_sms_outbox"""
+
+    def dispatch(self, phone, message):
+        from users.models import SMSOutbox
+
+        SMSOutbox.objects.create(phone=phone, message=message)
+
+
+@functools.lru_cache(maxsize=None)
+def _load(path):
+    return import_string(path)()
+
+
+def get_sms_backend():
+    """Возвращает шлюз, указанный в настройке SMS_BACKEND"""
+    return _load(settings.SMS_BACKEND)
+
+
+def get_dispatcher():
+    """Возвращает диспетчер, указанный в настройке SMS_DISPATCHER"""
+    return _load(settings.SMS_DISPATCHER)
+
+
+def send_sms(phone, message):
+    """Отправляет SMS через текущий шлюз"""
+    get_sms_backend().send(phone, message)
+
+
+def send_auth_code(phone, code):
+    """Ставит в очередь SMS с кодом авторизации"""
+    get_dispatcher().dispatch(phone, f"Код авторизации: {code}")
+
+
+async def asend_auth_code(phone, code):
+    """Асинхронно ставит в очередь SMS с кодом авторизации"""
+    await get_dispatcher().adispatch(phone, f"Код авторизации: {code}")
+
+
+def _claim_outbox(batch_size):
+    """Забирает пачку сообщений в отправку короткой транзакцией.
+
+    Сообщения переводятся в статус sending, поэтому другой обработчик их
+    не возьмет, даже если СУБД не поддерживает SKIP LOCKED. Сообщения,
+    зависшие в sending дольше SMS_OUTBOX_CLAIM_TIMEOUT (обработчик упал
+    до записи результата), снова считаются ожидающими.
+    """
+    from users.models import SMSOutbox
+
+    claimed_at = now()
+    SMSOutbox.objects.filter(
+        status=SMSOutbox.STATUS_SENDING,
+        claimed_at__lt=claimed_at - settings.SMS_OUTBOX_CLAIM_TIMEOUT,
+    ).update(status=SMSOutbox.STATUS_PENDING)
+
+    claim = {
+        "status": SMSOutbox.STATUS_SENDING,
+        "attempts": F("attempts") + 1,
+        "claimed_at": claimed_at,
+    }
+    pending = SMSOutbox.objects.filter(status=SMSOutbox.STATUS_PENDING)
+    with transaction.atomic():
+        if connection.features.has_select_for_update_skip_locked:
+            pks = list(
+                pending.select_for_update(skip_locked=True)
+                .order_by("pk")
+                .values_list("pk", flat=True)[:batch_size]
+            )
+            SMSOutbox.objects.filter(pk__in=pks).update(**claim)
+        else:
+            # условный UPDATE: строку получает только один обработчик
+            pks = [
+                pk
+                for pk in pending.order_by("pk").values_list("pk", flat=True)[
+                    :batch_size
+                ]
+                if pending.filter(pk=pk).update(**claim)
+            ]
+    return list(SMSOutbox.objects.filter(pk__in=pks).order_by("pk"))
+
+
+def process_outbox(batch_size=100):
+    """Отправляет пачку сообщений из таблицы исходящих, возвращает их количество.
+
+    Шлюз вызывается вне транзакции, результат записывается отдельным запросом.
+    """
+    from users.models import SMSOutbox
+
+    messages = _claim_outbox(batch_size)
+    for sms in messages:
+        try:
+            send_sms(sms.phone, sms.message)
+        except Exception as exc:
+            logger.exception("Не удалось отправить SMS #%s", sms.pk)
+            failed = sms.attempts >= settings.SMS_OUTBOX_MAX_ATTEMPTS
+            SMSOutbox.objects.filter(pk=sms.pk).update(
+                status=SMSOutbox.STATUS_FAILED if failed else SMSOutbox.STATUS_PENDING,
+                last_error=str(exc),
+            )
+        else:
+            SMSOutbox.objects.filter(pk=sms.pk).update(
+                status=SMSOutbox.STATUS_SENT, sent_at=now()
+            )
+    return len(messages)
@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from users.models import User
+from users.services import USER_EXPORT_FORMATS, iter_users_export
+
+
+class Command(BaseCommand):
+    help = "Выгружает пользователей в формате NDJSON или CSV"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=tuple(USER_EXPORT_FORMATS),
+            default="ndjson",
+        )
+        parser.add_argument(
+            "--output", help="Путь к файлу, по умолчанию стандартный вывод"
+        )
+        parser.add_argument("--chunk-size", type=int, default=2000)
+
+    def handle(self, *args, **options):
+        chunks = iter_users_export(
+            User.objects.all(), options["file_format"], options["chunk_size"]
+        )
+        if options["output"]:
+            with open(options["output"], "w", newline="", encoding="utf-8") as file:
+                file.writelines(chunks)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending="")
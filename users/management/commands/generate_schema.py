@@ -0,0 +1,24 @@
+from pathlib import Path
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from config.schema import CODECS, generate_schema
+
+
+class Command(BaseCommand):
+    help = "Создает файл OpenAPI схемы для swagger/redoc"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--output", help="Путь к файлу, по умолчанию OPENAPI_SCHEMA_PATH"
+        )
+        parser.add_argument(
+            "--format", dest="file_format", choices=tuple(CODECS), default="json"
+        )
+
+    def handle(self, *args, **options):
+        path = Path(options["output"] or settings.OPENAPI_SCHEMA_PATH)
+        content = generate_schema(options["file_format"])
+        path.write_bytes(content)
+        self.stdout.write(f"Схема записана в {path} ({len(content)} байт)")
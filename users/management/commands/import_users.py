@@ -0,0 +1,36 @@
+import os
+import sys
+
+from django.core.management.base import BaseCommand
+
+from users.services import USER_EXPORT_FORMATS, import_users, iter_import_phones
+
+
+class Command(BaseCommand):
+    help = "Массово создает пользователей по номерам из файла CSV или NDJSON"
+
+    def add_arguments(self, parser):
+        parser.add_argument("path", help="Путь к файлу, - для стандартного ввода")
+        parser.add_argument(
+            "--format",
+            dest="file_format",
+            choices=tuple(USER_EXPORT_FORMATS),
+            help="По умолчанию определяется по расширению файла",
+        )
+        parser.add_argument("--batch-size", type=int, default=5000)
+
+    def handle(self, *args, **options):
+        path = options["path"]
+        file_format = options["file_format"] or (
+            "csv" if os.path.splitext(path)[1].lower() == ".csv" else "ndjson"
+        )
+        if path == "-":
+            inserted, skipped = self.import_file(sys.stdin, file_format, options)
+        else:
+            with open(path, newline="", encoding="utf-8") as file:
+                inserted, skipped = self.import_file(file, file_format, options)
+        self.stdout.write(f"Добавлено пользователей: {inserted}, пропущено: {skipped}")
+
+    def import_file(self, file, file_format, options):
+        phones = iter_import_phones(file, file_format)
+        return import_users(phones, batch_size=options["batch_size"])
@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.services import purge_deleted_users
+
+
+class Command(BaseCommand):
+    help = "Удаляет строки пользователей, помеченных удаленными, пачками"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=1000)
+        parser.add_argument(
+            "--loop", action="store_true", help="Запускать очистку периодически"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=60.0, help="Пауза между запусками, сек."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            purged = purge_deleted_users(batch_size=options["batch_size"])
+            self.stdout.write(f"Удалено пользователей: {purged}")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
@@ -0,0 +1,25 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.revocation import purge_expired
+
+
+class Command(BaseCommand):
+    help = "Удаляет записи об отозванных токенах с истекшим сроком и обновляет фильтр"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--loop", action="store_true", help="Запускать очистку периодически"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=3600.0, help="Пауза между запусками, сек."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            deleted = purge_expired()
+            self.stdout.write(f"Удалено записей об отозванных токенах: {deleted}")
+            if not options["loop"]:
+                break
+            time.sleep(options["interval"])
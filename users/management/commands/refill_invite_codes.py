@@ -0,0 +1,18 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from users.services import refill_invite_code_pool
+
+
+class Command(BaseCommand):
+    help = "Пополняет пул зарезервированных Invite кодов"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--size", type=int, default=settings.INVITE_CODE_POOL_SIZE)
+        parser.add_argument("--batch-size", type=int, default=1000)
+
+    def handle(self, *args, **options):
+        added = refill_invite_code_pool(
+            options["size"], batch_size=options["batch_size"]
+        )
+        self.stdout.write(f"Добавлено Invite кодов: {added}")
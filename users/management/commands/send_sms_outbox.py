@@ -0,0 +1,28 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from users.delivery import process_outbox
+
+
+class Command(BaseCommand):
+    help = "Отправляет SMS из таблицы исходящих"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=100)
+        parser.add_argument(
+            "--loop", action="store_true", help="Работать постоянно, опрашивая очередь"
+        )
+        parser.add_argument(
+            "--interval", type=float, default=1.0, help="Пауза между опросами, сек."
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            sent = process_outbox(batch_size=options["batch_size"])
+            if sent:
+                self.stdout.write(f"Обработано сообщений: {sent}")
+            if not options["loop"]:
+                break
+            if sent < options["batch_size"]:
+                time.sleep(options["interval"])
@@ -0,0 +1,49 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:21
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+import users.operations
+
+
+class Migration(migrations.Migration):
+    # индексы создаются CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("users", "0003_smsoutbox"),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name="authcode",
+            options={
+                "verbose_name": "Код авторизации",
+                "verbose_name_plural": "Коды авторизации",
+            },
+        ),
+        users.operations.AddIndexConcurrently(
+            model_name="authcode",
+            index=models.Index(
+                fields=["user", "code", "-created_at"], name="users_authcode_verify_idx"
+            ),
+        ),
+        users.operations.AddIndexConcurrently(
+            model_name="authcode",
+            index=models.Index(
+                fields=["created_at"], name="users_authcode_created_idx"
+            ),
+        ),
+        # индекс внешнего ключа удаляется после создания заменяющего его составного
+        migrations.AlterField(
+            model_name="authcode",
+            name="user",
+            field=models.ForeignKey(
+                db_index=False,
+                on_delete=django.db.models.deletion.CASCADE,
+                related_name="auth_codes",
+                to=settings.AUTH_USER_MODEL,
+            ),
+        ),
+    ]
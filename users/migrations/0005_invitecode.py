@@ -0,0 +1,37 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:24
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0004_authcode_indexes"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="InviteCode",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "code",
+                    models.CharField(
+                        max_length=6, unique=True, verbose_name="Invite код"
+                    ),
+                ),
+            ],
+            options={
+                "verbose_name": "Резервный Invite код",
+                "verbose_name_plural": "Резервные Invite коды",
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:29
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+import users.operations
+
+
+def fill_referral_count(apps, schema_editor):
+    User = apps.get_model("users", "User")
+    counts = (
+        User.objects.filter(referrals=OuterRef("pk"))
+        .order_by()
+        .values("referrals")
+        .annotate(count=Count("pk"))
+        .values("count")
+    )
+    inviters = User.objects.filter(referrals__isnull=False).values("referrals")
+    User.objects.filter(pk__in=inviters).update(
+        referral_count=Coalesce(Subquery(counts), 0)
+    )
+
+
+class Migration(migrations.Migration):
+    # индекс создается CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0005_invitecode"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="user",
+            name="referral_count",
+            field=models.PositiveIntegerField(
+                default=0, verbose_name="Количество рефералов"
+            ),
+        ),
+        users.operations.AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["referrals", "id"], name="users_user_referrals_idx"
+            ),
+        ),
+        migrations.RunPython(
+            fill_referral_count, migrations.RunPython.noop, atomic=True
+        ),
+        migrations.AlterField(
+            model_name="user",
+            name="referrals",
+            field=models.ForeignKey(
+                blank=True,
+                db_index=False,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                to=settings.AUTH_USER_MODEL,
+                verbose_name="Рефералы",
+            ),
+        ),
+    ]
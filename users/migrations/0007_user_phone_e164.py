@@ -0,0 +1,67 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:45
+
+import phonenumbers
+from django.conf import settings
+from django.db import migrations, models
+
+import users.validators
+
+
+def normalize_phones(apps, schema_editor):
+    """Приводит сохраненные номера к E.164.
+
+    Если разные записи приводятся к одному номеру, миграция останавливается
+    со списком их pk: такие записи нужно объединить или исправить вручную.
+    """
+    User = apps.get_model("users", "User")
+    groups = {}
+    for user in User.objects.only("pk", "phone").iterator(chunk_size=2000):
+        try:
+            number = phonenumbers.parse(user.phone, settings.PHONE_DEFAULT_REGION)
+        except phonenumbers.NumberParseException:
+            phone = user.phone
+        else:
+            phone = phonenumbers.format_number(
+                number, phonenumbers.PhoneNumberFormat.E164
+            )
+        groups.setdefault(phone, []).append((user.pk, user.phone))
+
+    conflicts = [
+        f"{phone}: pk {', '.join(str(pk) for pk, _ in sorted(users))}"
+        for phone, users in groups.items()
+        if len(users) > 1
+    ]
+    if conflicts:
+        raise RuntimeError(
+            "Номера совпадают после приведения к E.164, объедините или исправьте "
+            "записи и повторите миграцию:\n" + "\n".join(conflicts)
+        )
+
+    changed = [
+        User(pk=pk, phone=phone)
+        for phone, users in groups.items()
+        for pk, original in users
+        if original != phone
+    ]
+    User.objects.bulk_update(changed, ["phone"], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0006_user_referral_count"),
+    ]
+
+    operations = [
+        migrations.RunPython(normalize_phones, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name="user",
+            name="phone",
+            field=models.CharField(
+                max_length=35,
+                unique=True,
+                validators=[users.validators.PhoneNumberValidator()],
+                verbose_name="Номер телефона",
+            ),
+        ),
+    ]
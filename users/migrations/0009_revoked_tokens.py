@@ -0,0 +1,68 @@
+# Generated by Django 5.2.18 on 2026-10-18 18:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0008_user_avatar_thumbnails"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RevokedToken",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "jti",
+                    models.CharField(
+                        max_length=255, unique=True, verbose_name="ID токена"
+                    ),
+                ),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Срок действия"),
+                ),
+            ],
+            options={
+                "verbose_name": "Отозванный токен",
+                "verbose_name_plural": "Отозванные токены",
+            },
+        ),
+        migrations.CreateModel(
+            name="UserTokenRevocation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "user_id",
+                    models.BigIntegerField(unique=True, verbose_name="ID пользователя"),
+                ),
+                ("revoked_at", models.DateTimeField(verbose_name="Дата отзыва")),
+                (
+                    "expires_at",
+                    models.DateTimeField(db_index=True, verbose_name="Срок действия"),
+                ),
+            ],
+            options={
+                "verbose_name": "Отзыв токенов пользователя",
+                "verbose_name_plural": "Отзывы токенов пользователей",
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:10
+
+from django.db import migrations, models
+
+import users.operations
+
+
+class Migration(migrations.Migration):
+    # индексы создаются CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0009_revoked_tokens"),
+    ]
+
+    operations = [
+        users.operations.AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(fields=["city", "id"], name="users_user_city_idx"),
+        ),
+        users.operations.AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                fields=["is_active", "id"], name="users_user_active_idx"
+            ),
+        ),
+    ]
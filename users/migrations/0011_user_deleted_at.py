@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:13
+
+import django.db.models.manager
+from django.db import migrations, models
+
+import users.models
+import users.operations
+
+
+class Migration(migrations.Migration):
+    # индекс создается CONCURRENTLY, вне транзакции
+    atomic = False
+
+    dependencies = [
+        ("auth", "0012_alter_user_first_name_max_length"),
+        ("users", "0010_user_admin_indexes"),
+    ]
+
+    operations = [
+        migrations.AlterModelManagers(
+            name="user",
+            managers=[
+                ("objects", django.db.models.manager.Manager()),
+                ("all_objects", users.models.UserManager()),
+            ],
+        ),
+        migrations.AddField(
+            model_name="user",
+            name="deleted_at",
+            field=models.DateTimeField(
+                blank=True, null=True, verbose_name="Дата удаления"
+            ),
+        ),
+        users.operations.AddIndexConcurrently(
+            model_name="user",
+            index=models.Index(
+                condition=models.Q(("deleted_at__isnull", False)),
+                fields=["deleted_at"],
+                name="users_user_deleted_idx",
+            ),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-18 19:27
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("users", "0012_smsoutbox_claim"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="authcode",
+            name="attempts",
+            field=models.PositiveSmallIntegerField(
+                default=0, verbose_name="Неверные попытки"
+            ),
+        ),
+    ]
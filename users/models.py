@@ -1,10 +1,16 @@
+import os
+
 from django.apps import apps
+from django.conf import settings
 from django.contrib.auth.base_user import BaseUserManager
-from django.contrib.auth.hashers import make_password
 from django.contrib.auth.models import AbstractUser
+from django.core.files.storage import FileSystemStorage
 from django.db import models
 from django.utils.timezone import now
 
+from users.phones import normalize_phone_or_none
+from users.validators import PhoneNumberValidator
+
 NULLABLE = {"null": True, "blank": True}
 
 
@@ -21,7 +27,11 @@ class UserManager(BaseUserManager):
         )
         phone = GlobalUserModel.normalize_username(phone)
         user = self.model(phone=phone, **extra_fields)
-        user.password = make_password(password)
+        if password is None:
+            # вход выполняется по коду авторизации, хеширование не требуется
+            user.set_unusable_password()
+        else:
+            user.set_password(password)
         user.save(using=self._db)
         return user
 
@@ -42,15 +52,35 @@ class UserManager(BaseUserManager):
         return self._create_user(phone, password, **extra_fields)
 
 
+class ExistingUserManager(UserManager):
+    """Менеджер пользователей без помеченных удаленными"""
+
+    use_in_migrations = False
+
+    def get_queryset(self):
+        return super().get_queryset().filter(deleted_at__isnull=True)
+
+
 class User(AbstractUser):
     """Модель для сущности User (Пользователь)"""
 
-    objects = UserManager()
+    objects = ExistingUserManager()
+    # включая помеченных удаленными
+    all_objects = UserManager()
 
     username = None
     email = models.EmailField(verbose_name="Email", **NULLABLE)
     avatar = models.ImageField(upload_to="users/", verbose_name="Аватар", **NULLABLE)
-    phone = models.CharField(max_length=35, unique=True, verbose_name="Номер телефона")
+    # имена файлов миниатюр по размерам, заполняются фоновой обработкой аватара
+    avatar_thumbnails = models.JSONField(
+        default=dict, blank=True, verbose_name="Миниатюры аватара"
+    )
+    phone = models.CharField(
+        max_length=35,
+        unique=True,
+        validators=[PhoneNumberValidator()],
+        verbose_name="Номер телефона",
+    )
     city = models.CharField(max_length=50, verbose_name="Город", **NULLABLE)
     telegram_id = models.CharField(
         max_length=100, verbose_name="Телеграм ID", **NULLABLE
@@ -61,8 +91,16 @@ class User(AbstractUser):
     referral_code = models.CharField(
         max_length=6, verbose_name="Код реферала", **NULLABLE
     )
+    # индекс по referrals покрывается составным индексом (referrals, id)
     referrals = models.ForeignKey(
-        "self", on_delete=models.SET_NULL, verbose_name="Рефералы", **NULLABLE
+        "self",
+        on_delete=models.SET_NULL,
+        verbose_name="Рефералы",
+        db_index=False,
+        **NULLABLE,
+    )
+    referral_count = models.PositiveIntegerField(
+        default=0, verbose_name="Количество рефералов"
     )
 
     is_active = models.BooleanField(default=False, verbose_name="Состояние активности")
@@ -71,24 +109,222 @@ class User(AbstractUser):
     is_authenticate = models.BooleanField(
         default=False, verbose_name="Признак авторизации"
     )
+    # строка удаляется командой purge_deleted_users
+    deleted_at = models.DateTimeField(verbose_name="Дата удаления", **NULLABLE)
 
     USERNAME_FIELD = "phone"
     REQUIRED_FIELDS = []
 
+    @classmethod
+    def normalize_username(cls, username):
+        # номер приводится к E.164, некорректный отклонит PhoneNumberValidator
+        return normalize_phone_or_none(username) or super().normalize_username(username)
+
     def __str__(self):
         return f"ID: {self.id} / Phone: {self.phone} / Status: {self.is_active} / Auth: {self.is_authenticate}"
 
     class Meta:
         verbose_name = "Пользователь"
         verbose_name_plural = "Пользователи"
+        indexes = [
+            models.Index(fields=["referrals", "id"], name="users_user_referrals_idx"),
+            # фильтры админки с сортировкой по id
+            models.Index(fields=["city", "id"], name="users_user_city_idx"),
+            models.Index(fields=["is_active", "id"], name="users_user_active_idx"),
+            models.Index(
+                fields=["deleted_at"],
+                condition=models.Q(deleted_at__isnull=False),
+                name="users_user_deleted_idx",
+            ),
+        ]
+
+
+class InviteCode(models.Model):
+    """Модель для пула зарезервированных Invite кодов"""
+
+    code = models.CharField(max_length=6, unique=True, verbose_name="Invite код")
+
+    def __str__(self):
+        return self.code
+
+    class Meta:
+        verbose_name = "Резервный Invite код"
+        verbose_name_plural = "Резервные Invite коды"
+
+
+class AuthCodeQuerySet(models.QuerySet):
+    """QuerySet для кодов авторизации с учетом срока действия"""
+
+    def active(self):
+        return self.filter(created_at__gt=now() - settings.AUTH_CODE_TTL)
+
+    def expired(self):
+        return self.filter(created_at__lte=now() - settings.AUTH_CODE_TTL)
+
+    def purge_expired(self, batch_size=10000):
+        """Удаляет просроченные коды пачками, возвращает количество удаленных"""
+        deleted = 0
+        while True:
+            pks = list(self.expired().values_list("pk", flat=True)[:batch_size])
+            if not pks:
+                return deleted
+            deleted += self.filter(pk__in=pks).delete()[0]
+            if len(pks) < batch_size:
+                return deleted
 
 
 class AuthCode(models.Model):
     """Модель для хранения кодов авторизации"""
 
-    user = models.ForeignKey(User, on_delete=models.CASCADE, related_name="auth_codes")
+    objects = AuthCodeQuerySet.as_manager()
+
+    # индекс по user покрывается составным индексом ниже
+    user = models.ForeignKey(
+        User, on_delete=models.CASCADE, related_name="auth_codes", db_index=False
+    )
     code = models.CharField(max_length=6, verbose_name="Код авторизации")
     created_at = models.DateTimeField(default=now, verbose_name="Дата создания")
+    # неверные попытки ввода, после AUTH_CODE_MAX_ATTEMPTS код не принимается
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Неверные попытки"
+    )
 
     def __str__(self):
         return f"Код {self.code} для {self.user.phone}"
+
+    class Meta:
+        verbose_name = "Код авторизации"
+        verbose_name_plural = "Коды авторизации"
+        indexes = [
+            models.Index(
+                fields=["user", "code", "-created_at"], name="users_authcode_verify_idx"
+            ),
+            models.Index(fields=["created_at"], name="users_authcode_created_idx"),
+        ]
+
+
+class SMSOutbox(models.Model):
+    """Модель для таблицы исходящих SMS"""
+
+    STATUS_PENDING = "pending"
+    STATUS_SENDING = "sending"
+    STATUS_SENT = "sent"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Ожидает отправки"),
+        (STATUS_SENDING, "Отправляется"),
+        (STATUS_SENT, "Отправлено"),
+        (STATUS_FAILED, "Ошибка отправки"),
+    )
+
+    phone = models.CharField(max_length=35, verbose_name="Номер телефона")
+    message = models.CharField(max_length=255, verbose_name="Текст сообщения")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Статус",
+    )
+    attempts = models.PositiveSmallIntegerField(
+        default=0, verbose_name="Попытки отправки"
+    )
+    last_error = models.TextField(verbose_name="Последняя ошибка", **NULLABLE)
+    created_at = models.DateTimeField(default=now, verbose_name="Дата создания")
+    claimed_at = models.DateTimeField(verbose_name="Дата взятия в отправку", **NULLABLE)
+    sent_at = models.DateTimeField(verbose_name="Дата отправки", **NULLABLE)
+
+    def __str__(self):
+        return f"SMS для {self.phone} ({self.status})"
+
+    class Meta:
+        verbose_name = "Исходящее SMS"
+        verbose_name_plural = "Исходящие SMS"
+        indexes = [models.Index(fields=["status", "id"])]
+
+
+class RevokedToken(models.Model):
+    """Модель для отозванных токенов, хранится до истечения срока токена"""
+
+    jti = models.CharField(max_length=255, unique=True, verbose_name="ID токена")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Срок действия")
+
+    def __str__(self):
+        return self.jti
+
+    class Meta:
+        verbose_name = "Отозванный токен"
+        verbose_name_plural = "Отозванные токены"
+
+
+class UserTokenRevocation(models.Model):
+    """Модель для отзыва всех токенов пользователя, выданных до revoked_at.
+
+    Хранит id без внешнего ключа, чтобы запись пережила удаление пользователя.
+    """
+
+    user_id = models.BigIntegerField(unique=True, verbose_name="ID пользователя")
+    revoked_at = models.DateTimeField(verbose_name="Дата отзыва")
+    expires_at = models.DateTimeField(db_index=True, verbose_name="Срок действия")
+
+    def __str__(self):
+        return f"Токены пользователя {self.user_id} до {self.revoked_at}"
+
+    class Meta:
+        verbose_name = "Отзыв токенов пользователя"
+        verbose_name_plural = "Отзывы токенов пользователей"
+
+
+class UserImportStorage(FileSystemStorage):
+    """Хранилище файлов импорта в USER_IMPORT_DIR, вне MEDIA_ROOT и без URL"""
+
+    @property
+    def base_location(self):
+        return settings.USER_IMPORT_DIR
+
+    @property
+    def location(self):
+        return os.path.abspath(self.base_location)
+
+
+class UserImport(models.Model):
+    """Модель для фонового импорта пользователей из файла"""
+
+    STATUS_PENDING = "pending"
+    STATUS_RUNNING = "running"
+    STATUS_DONE = "done"
+    STATUS_FAILED = "failed"
+    STATUS_CHOICES = (
+        (STATUS_PENDING, "Ожидает"),
+        (STATUS_RUNNING, "Выполняется"),
+        (STATUS_DONE, "Завершен"),
+        (STATUS_FAILED, "Ошибка"),
+    )
+
+    file = models.FileField(
+        storage=UserImportStorage(), verbose_name="Файл", **NULLABLE
+    )
+    file_format = models.CharField(max_length=10, verbose_name="Формат файла")
+    status = models.CharField(
+        max_length=10,
+        choices=STATUS_CHOICES,
+        default=STATUS_PENDING,
+        verbose_name="Статус",
+    )
+    inserted = models.PositiveIntegerField(default=0, verbose_name="Добавлено")
+    skipped = models.PositiveIntegerField(default=0, verbose_name="Пропущено")
+    error = models.TextField(verbose_name="Ошибка", **NULLABLE)
+    created_by = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.SET_NULL,
+        verbose_name="Автор",
+        **NULLABLE,
+    )
+    created_at = models.DateTimeField(default=now, verbose_name="Дата создания")
+    finished_at = models.DateTimeField(verbose_name="Дата завершения", **NULLABLE)
+
+    def __str__(self):
+        return f"Импорт {self.pk} ({self.status})"
+
+    class Meta:
+        verbose_name = "Импорт пользователей"
+        verbose_name_plural = "Импорты пользователей"
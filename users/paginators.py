@@ -0,0 +1,73 @@
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.paginator import Paginator
+from django.db import connections
+from django.utils.functional import cached_property
+from rest_framework.pagination import CursorPagination
+
+ESTIMATED_RATIO_CACHE_KEY = "admin_estimated_ratio:{}"
+
+
+class UserCursorPagination(CursorPagination):
+    """Пагинация по ключу id: стоимость страницы не зависит от размера таблицы"""
+
+    ordering = "id"
+    page_size = 100
+    page_size_query_param = "page_size"
+    max_page_size = 1000
+
+
+def _planner_rows(queryset):
+    plan = json.loads(queryset.order_by().explain(format="json"))
+    if isinstance(plan, list):
+        plan = plan[0]
+    return plan["Plan"]["Plan Rows"]
+
+
+def estimated_count(queryset):
+    """Оценка числа строк по статистике Postgres вместо COUNT(*).
+
+    Для выборки без условий, кроме базового фильтра менеджера (без помеченных
+    удаленными), берется reltuples из pg_class, умноженный на долю строк под
+    базовым фильтром из кеша. Для выборки с условиями - оценка планировщика.
+    Малые оценки (меньше ADMIN_ESTIMATED_COUNT_THRESHOLD) и другие СУБД
+    считаются точно.
+    """
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return queryset.count()
+
+    model = queryset.model
+    base_where = model._default_manager.get_queryset().query.where
+    if queryset.query.where != base_where or queryset.query.distinct:
+        estimate = _planner_rows(queryset)
+    else:
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT reltuples::bigint FROM pg_class WHERE oid = %s::regclass",
+                [connection.ops.quote_name(model._meta.db_table)],
+            )
+            row = cursor.fetchone()
+        estimate = row[0] if row else -1
+        if base_where and estimate > 0:
+            key = ESTIMATED_RATIO_CACHE_KEY.format(model._meta.label_lower)
+            ratio = cache.get(key)
+            if ratio is None:
+                ratio = min(_planner_rows(queryset) / estimate, 1)
+                cache.set(key, ratio, settings.ADMIN_ESTIMATED_RATIO_CACHE_TIMEOUT)
+            estimate = round(estimate * ratio)
+
+    # -1 у таблицы, для которой еще не собиралась статистика
+    if estimate < settings.ADMIN_ESTIMATED_COUNT_THRESHOLD:
+        return queryset.count()
+    return estimate
+
+
+class EstimatedCountPaginator(Paginator):
+    """Пагинатор админки с приблизительным числом записей для больших таблиц"""
+
+    @cached_property
+    def count(self):
+        return estimated_count(self.object_list)
@@ -10,8 +10,16 @@ class IsUserStaff(BasePermission):
         return False
 
 
+class IsStaffOrSuperuser(BasePermission):
+    """Проверка на Модератора или Администратора для любых методов"""
+
+    def has_permission(self, request, view):
+        return bool(request.user.is_staff or request.user.is_superuser)
+
+
 class IsOwner(BasePermission):
     """Проверка на владельца"""
 
     def has_object_permission(self, request, view, obj):
-        return request.user == obj
+        # request.user может быть ClaimsTokenUser, у которого id - строка
+        return str(request.user.pk) == str(obj.pk)
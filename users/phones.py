@@ -0,0 +1,86 @@
+import functools
+import re
+
+import phonenumbers
+from django.conf import settings
+
+E164 = phonenumbers.PhoneNumberFormat.E164
+# мобильные номера России уже в E.164: шаблон 9\d{9} метаданных RU принимает
+# любой такой номер, поэтому разбор phonenumbers для них не нужен
+RU_MOBILE_E164_RE = re.compile(r"\+79\d{9}")
+
+
+class PhoneNumberError(ValueError):
+    """Номер телефона не распознан или не разрешен"""
+
+
+@functools.lru_cache(maxsize=65536)
+def _parse(phone, region):
+    """Разбирает номер один раз, повторные номера берутся из кеша"""
+    try:
+        number = phonenumbers.parse(phone, region)
+    except phonenumbers.NumberParseException:
+        return None
+    if not phonenumbers.is_valid_number(number):
+        return None
+    return phonenumbers.format_number(number, E164), number.country_code
+
+
+def normalize_phone(phone):
+    """Приводит номер телефона к формату E.164 (+79051122333).
+
+    Номера без кода страны разбираются для региона PHONE_DEFAULT_REGION,
+    коды стран ограничиваются настройкой PHONE_ALLOWED_COUNTRY_CODES.
+    """
+    if not isinstance(phone, str) or not phone.strip():
+        raise PhoneNumberError("Номер телефона не может быть пуст.")
+    phone = phone.strip()
+    if RU_MOBILE_E164_RE.fullmatch(phone):
+        e164, country_code = phone, 7
+    else:
+        parsed = _parse(phone, settings.PHONE_DEFAULT_REGION)
+        if parsed is None:
+            raise PhoneNumberError("Введите корректный номер телефона.")
+        e164, country_code = parsed
+    allowed = settings.PHONE_ALLOWED_COUNTRY_CODES
+    if allowed and country_code not in allowed:
+        codes = ", ".join(f"+{code}" for code in allowed)
+        raise PhoneNumberError(f"Номер телефона должен начинаться с {codes}...")
+    return e164
+
+
+def normalize_phone_or_none(phone):
+    """normalize_phone, возвращающая None вместо исключения"""
+    try:
+        return normalize_phone(phone)
+    except PhoneNumberError:
+        return None
+
+
+def normalize_phone_prefix(prefix):
+    """Приводит начало номера к E.164 для поиска по префиксу (8905 -> +7905).
+
+    Как и при разборе полного номера, начало без "+" и кода страны считается
+    национальной записью для PHONE_DEFAULT_REGION: национальный префикс (8)
+    заменяется кодом страны. None, если цифр нет.
+    """
+    digits = re.sub(r"\D", "", prefix)
+    if not digits:
+        return None
+    metadata = phonenumbers.PhoneMetadata.metadata_for_region(
+        settings.PHONE_DEFAULT_REGION
+    )
+    if prefix.strip().startswith("+") or metadata is None:
+        return f"+{digits}"
+    country_code = str(metadata.country_code)
+    if digits.startswith(country_code):
+        return f"+{digits}"
+    national_prefix = metadata.national_prefix
+    if national_prefix and digits.startswith(national_prefix):
+        digits = digits[len(national_prefix) :]
+    return f"+{country_code}{digits}"
+
+
+def load_metadata():
+    """Загружает метаданные региона по умолчанию до обработки первого запроса"""
+    phonenumbers.PhoneMetadata.metadata_for_region(settings.PHONE_DEFAULT_REGION)
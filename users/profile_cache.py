@@ -0,0 +1,54 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+
+# Увеличивается при изменении состава полей UserProfileSerializer
+PROFILE_CACHE_VERSION = 2
+
+
+def _cache():
+    return caches[settings.PROFILE_CACHE]
+
+
+def _keys(pk):
+    return f"user_profile:{pk}", f"user_profile_etag:{pk}"
+
+
+def get_profile_etag(pk):
+    """Возвращает ETag закешированного профиля или None"""
+    return _cache().get(_keys(pk)[1], version=PROFILE_CACHE_VERSION)
+
+
+def get_profile(pk):
+    """Возвращает пару (ETag, данные профиля) из кеша или None"""
+    return _cache().get(_keys(pk)[0], version=PROFILE_CACHE_VERSION)
+
+
+def set_profile(pk, data):
+    """Кеширует данные профиля, возвращает их ETag"""
+    data = dict(data)
+    etag = hashlib.md5(
+        json.dumps(data, sort_keys=True, default=str).encode(), usedforsecurity=False
+    ).hexdigest()
+    key, etag_key = _keys(pk)
+    _cache().set_many(
+        {key: (etag, data), etag_key: etag},
+        settings.PROFILE_CACHE_TIMEOUT,
+        version=PROFILE_CACHE_VERSION,
+    )
+    return etag
+
+
+def invalidate_profile(*pks):
+    """Удаляет профили из кеша после фиксации текущей транзакции.
+
+    При сбросе до фиксации параллельный GET успел бы закешировать старую строку.
+    """
+    keys = [key for pk in pks if pk is not None for key in _keys(pk)]
+    if keys:
+        transaction.on_commit(
+            lambda: _cache().delete_many(keys, version=PROFILE_CACHE_VERSION)
+        )
@@ -0,0 +1,282 @@
+"""Отзыв JWT токенов до истечения срока действия.
+
+Отозванные jti и отметки "токены пользователя, выданные до" хранятся в БД.
+Перед БД стоит фильтр Блума в памяти процесса: отрицательный ответ фильтра
+означает, что токен точно не отозван, и проверка обходится без запросов.
+Только совпадения в фильтре проверяются точным запросом к БД.
+
+Полный фильтр строится по БД и публикуется в общем кеше при старте, очистке
+и в фоне, когда накопится TOKEN_REVOCATION_REBUILD_DELTAS отзывов. Каждый отзыв
+после фиксации транзакции получает номер атомарным cache.incr и записывается в
+журнал в кеше. Процессы не чаще раза в TOKEN_REVOCATION_FILTER_REFRESH секунд
+дочитывают из журнала отзывы после своего номера, поэтому в других процессах
+отзыв вступает в силу с этой задержкой. При пропуске в журнале (запись
+вытеснена из кеша или счетчик сброшен) процесс перестраивает фильтр по БД.
+"""
+
+import hashlib
+import math
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta, timezone
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils.timezone import now
+from rest_framework_simplejwt.settings import api_settings
+
+from users.models import RevokedToken, UserTokenRevocation
+from users.workers import submit
+
+FILTER_CACHE_KEY = "token_revocation_filter"
+FILTER_VERSION_KEY = "token_revocation_filter_version"
+DELTA_SEQ_KEY = "token_revocation_seq"
+REBUILD_LOCK_KEY = "token_revocation_rebuild"
+REBUILD_LOCK_TIMEOUT = 300
+
+_filter = None
+_checked_at = 0.0
+_lock = threading.RLock()
+
+
+class BloomFilter:
+    """Фильтр Блума с двойным хешированием blake2b"""
+
+    def __init__(self, size, hash_count, bits=None, version=None, seq=0):
+        self.size = size
+        self.hash_count = hash_count
+        self.bits = bytearray(bits) if bits is not None else bytearray(-(-size // 8))
+        self.version = version
+        # номер последнего учтенного отзыва из журнала и номер, с которым фильтр
+        # был построен по БД
+        self.seq = self.base_seq = seq
+
+    @classmethod
+    def for_capacity(cls, capacity, error_rate):
+        """Фильтр размера, обеспечивающего error_rate при capacity элементах"""
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        hash_count = max(1, round(size / capacity * math.log(2)))
+        return cls(size, hash_count)
+
+    def _positions(self, key):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return ((first + i * second) % self.size for i in range(self.hash_count))
+
+    def add(self, key):
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key):
+        bits = self.bits
+        return all(
+            bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(key)
+        )
+
+
+def _cache():
+    return caches[settings.TOKEN_REVOCATION_CACHE]
+
+
+def _delta_key(seq):
+    return f"token_revocation_delta:{seq}"
+
+
+def _jti_key(jti):
+    return f"jti:{jti}"
+
+
+def _user_key(user_id):
+    return f"user:{user_id}"
+
+
+def _expires_at(token):
+    return datetime.fromtimestamp(token["exp"], tz=timezone.utc)
+
+
+def build_filter():
+    """Строит фильтр по действующим записям БД"""
+    current = now()
+    jtis = RevokedToken.objects.filter(expires_at__gt=current).values_list(
+        "jti", flat=True
+    )
+    user_ids = UserTokenRevocation.objects.filter(expires_at__gt=current).values_list(
+        "user_id", flat=True
+    )
+    keys = [_jti_key(jti) for jti in jtis] + [_user_key(pk) for pk in user_ids]
+
+    bloom = BloomFilter.for_capacity(
+        max(settings.TOKEN_REVOCATION_FILTER_CAPACITY, 2 * len(keys)),
+        settings.TOKEN_REVOCATION_FILTER_ERROR_RATE,
+    )
+    for key in keys:
+        bloom.add(key)
+    return bloom
+
+
+def publish_filter():
+    """Перестраивает фильтр по БД и публикует его в кеше для всех процессов"""
+    global _filter, _checked_at
+    cache = _cache()
+    # отзывы с номером не больше seq зафиксированы в БД до его чтения и попадут
+    # в фильтр, более поздние процессы дочитают из журнала
+    seq = cache.get(DELTA_SEQ_KEY, 0)
+    bloom = build_filter()
+    bloom.version = uuid.uuid4().hex
+    bloom.seq = bloom.base_seq = seq
+    cache.set(
+        FILTER_CACHE_KEY,
+        (bloom.version, bloom.size, bloom.hash_count, bytes(bloom.bits), seq),
+        None,
+    )
+    cache.set(FILTER_VERSION_KEY, bloom.version, None)
+    with _lock:
+        _filter, _checked_at = bloom, time.monotonic()
+    return bloom
+
+
+def _publish_in_background():
+    try:
+        publish_filter()
+    finally:
+        _cache().delete(REBUILD_LOCK_KEY)
+
+
+def schedule_publish():
+    """Перестраивает фильтр в фоновом потоке, если этого уже не делает другой процесс"""
+    if _cache().add(REBUILD_LOCK_KEY, True, REBUILD_LOCK_TIMEOUT):
+        submit(_publish_in_background)
+
+
+def _rebuild_local(version, seq):
+    # журнал не покрывает разрыв: фильтр процесса строится по БД,
+    # общий фильтр обновляется в фоне
+    bloom = build_filter()
+    bloom.version = version
+    bloom.seq = bloom.base_seq = seq
+    schedule_publish()
+    return bloom
+
+
+def _refresh():
+    global _filter
+    cache = _cache()
+    state = cache.get_many([FILTER_VERSION_KEY, DELTA_SEQ_KEY])
+    version = state.get(FILTER_VERSION_KEY)
+    if version is None:
+        return publish_filter()
+    if _filter is None or _filter.version != version:
+        cached = cache.get(FILTER_CACHE_KEY)
+        if cached is None:
+            return publish_filter()
+        version, size, hash_count, bits, base_seq = cached
+        _filter = BloomFilter(size, hash_count, bits, version, base_seq)
+
+    seq = state.get(DELTA_SEQ_KEY, 0)
+    if seq < _filter.seq:
+        # счетчик журнала сброшен
+        _filter = _rebuild_local(version, seq)
+    elif seq > _filter.seq:
+        keys = [_delta_key(n) for n in range(_filter.seq + 1, seq + 1)]
+        deltas = cache.get_many(keys)
+        if len(deltas) < len(keys):
+            _filter = _rebuild_local(version, seq)
+        else:
+            for key in deltas.values():
+                _filter.add(key)
+            _filter.seq = seq
+            if seq - _filter.base_seq >= settings.TOKEN_REVOCATION_REBUILD_DELTAS:
+                schedule_publish()
+    return _filter
+
+
+def get_filter():
+    """Возвращает фильтр процесса, при необходимости дочитывая журнал отзывов"""
+    global _checked_at
+    if (
+        _filter is not None
+        and time.monotonic() - _checked_at < settings.TOKEN_REVOCATION_FILTER_REFRESH
+    ):
+        return _filter
+
+    with _lock:
+        if _filter is None or time.monotonic() - _checked_at >= (
+            settings.TOKEN_REVOCATION_FILTER_REFRESH
+        ):
+            _refresh()
+            _checked_at = time.monotonic()
+    return _filter
+
+
+def _add_local(key):
+    # отзыв сразу виден в текущем процессе, до публикации фильтра
+    bloom = get_filter()
+    bloom.add(key)
+
+
+def publish_key(key):
+    """Записывает отзыв в журнал под следующим номером"""
+    cache = _cache()
+    cache.add(DELTA_SEQ_KEY, 0, None)
+    seq = cache.incr(DELTA_SEQ_KEY)
+    cache.set(_delta_key(seq), key, settings.TOKEN_REVOCATION_DELTA_TIMEOUT)
+    # фильтр процесса мог быть заменен фоновой перестройкой после _add_local
+    _add_local(key)
+
+
+def is_revoked(token):
+    """Проверяет, отозван ли провалидированный токен"""
+    bloom = get_filter()
+    jti = token.get(api_settings.JTI_CLAIM)
+    user_id = token.get(api_settings.USER_ID_CLAIM)
+    if jti and _jti_key(jti) in bloom:
+        if RevokedToken.objects.filter(jti=jti).exists():
+            return True
+    if user_id is not None and _user_key(user_id) in bloom:
+        # iat - целые секунды, поэтому токен, выданный в ту же секунду, что и
+        # отзыв, считается выданным после него: отзываются токены, выданные
+        # в предыдущие секунды (revoked_at >= iat + 1 с)
+        issued_at = datetime.fromtimestamp(token.get("iat", 0), tz=timezone.utc)
+        return UserTokenRevocation.objects.filter(
+            user_id=user_id, revoked_at__gte=issued_at + timedelta(seconds=1)
+        ).exists()
+    return False
+
+
+def revoke_token(token):
+    """Отзывает токен по jti до истечения его срока действия"""
+    jti = token[api_settings.JTI_CLAIM]
+    RevokedToken.objects.get_or_create(
+        jti=jti, defaults={"expires_at": _expires_at(token)}
+    )
+    key = _jti_key(jti)
+    _add_local(key)
+    transaction.on_commit(lambda: publish_key(key))
+
+
+def revoke_user_tokens(user_id):
+    """Отзывает все токены пользователя, выданные до текущего момента"""
+    revoked_at = now()
+    UserTokenRevocation.objects.update_or_create(
+        user_id=user_id,
+        defaults={
+            "revoked_at": revoked_at,
+            "expires_at": revoked_at + settings.SIMPLE_JWT["REFRESH_TOKEN_LIFETIME"],
+        },
+    )
+    key = _user_key(user_id)
+    _add_local(key)
+    transaction.on_commit(lambda: publish_key(key))
+
+
+def purge_expired():
+    """Удаляет записи об отозванных токенах с истекшим сроком, возвращает их число"""
+    current = now()
+    deleted = RevokedToken.objects.filter(expires_at__lte=current).delete()[0]
+    deleted += UserTokenRevocation.objects.filter(expires_at__lte=current).delete()[0]
+    publish_filter()
+    return deleted
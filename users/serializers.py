@@ -1,64 +1,231 @@
+from django.conf import settings
+from django.db import transaction
+from PIL import Image
 from rest_framework import serializers
+from rest_framework.exceptions import AuthenticationFailed
+from rest_framework.validators import UniqueValidator
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
+from rest_framework_simplejwt.serializers import (
+    TokenObtainPairSerializer,
+    TokenRefreshSerializer,
+)
+from rest_framework_simplejwt.settings import api_settings
+
+from users.avatars import (
+    AVATAR_FORMATS,
+    avatar_thumbnail_urls,
+    schedule_avatar_processing,
+)
+from users.models import User, UserImport
+from users.phones import PhoneNumberError, normalize_phone
+from users.revocation import is_revoked
+from users.services import USER_EXPORT_FORMATS, InviteCodeError, apply_referral_code
+from users.tokens import USER_TOKEN_CLAIMS, UserRefreshToken
+
+
+class PhoneNumberField(serializers.CharField):
+    """Номер телефона, приводимый к формату E.164"""
+
+    def to_internal_value(self, data):
+        try:
+            return normalize_phone(super().to_internal_value(data))
+        except PhoneNumberError as exc:
+            raise serializers.ValidationError(str(exc))
 
-from users.models import User
 
+class AvatarField(serializers.ImageField):
+    """Изображение, проверяемое только по заголовку файла.
 
-class UserRegistrationSerializer(serializers.ModelSerializer):
-    class Meta:
-        model = User
-        fields = ("phone",)
+    Полное декодирование и миниатюры выполняются в фоне, поэтому время запроса
+    не зависит от размера изображения.
+    """
+
+    def to_internal_value(self, data):
+        file = serializers.FileField.to_internal_value(self, data)
+        if file.size > settings.AVATAR_MAX_UPLOAD_SIZE:
+            raise serializers.ValidationError("Файл изображения слишком большой.")
+        try:
+            image_format = Image.open(file).format
+        except Exception:
+            image_format = None
+        if image_format not in AVATAR_FORMATS:
+            self.fail("invalid_image")
+        file.seek(0)
+        return file
+
+
+class UserRegistrationSerializer(serializers.Serializer):
+    # без UniqueValidator: повторный вход существующего пользователя допустим,
+    # а валидация не обращается к БД; Serializer вместо ModelSerializer
+    # избавляет вход от разбора полей модели на каждый запрос
+    phone = PhoneNumberField()
 
 
 class UserVerifySerializer(serializers.Serializer):
-    phone = serializers.CharField()
+    phone = PhoneNumberField()
     auth_code = serializers.CharField()
 
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    phone = PhoneNumberField(
+        required=False,
+        validators=[
+            UniqueValidator(
+                queryset=User.objects.all(),
+                message="Пользователь с таким номером телефона уже существует.",
+            )
+        ],
+    )
     referral_code = serializers.CharField(required=False, allow_null=True)
+    avatar = AvatarField(required=False, allow_null=True)
+    avatar_thumbnails = serializers.SerializerMethodField()
 
     class Meta:
         model = User
         fields = (
             "email",
             "avatar",
+            "avatar_thumbnails",
             "phone",
             "city",
             "telegram_id",
             "invite_code",
             "referral_code",
             "referrals",
+            "referral_count",
         )
-        read_only_fields = ("invite_code", "referrals")
-
-    def validate_referral_code(self, value):
-        """Валидация реферального кода."""
-        if not value:
-            return value
-
-        try:
-            referral_user = User.objects.get(invite_code=value)
-        except User.DoesNotExist:
-            raise serializers.ValidationError("Неверный invite-код.")
-
-        current_user = self.instance
-        if current_user and current_user.referrals:
-            raise serializers.ValidationError("Вы уже использовали invite-код.")
+        read_only_fields = ("invite_code", "referrals", "referral_count")
 
-        return value
+    def get_avatar_thumbnails(self, obj):
+        return avatar_thumbnail_urls(obj, self.context.get("request"))
 
     def update(self, instance, validated_data):
         """Обновление профиля пользователя с учетом реферального кода."""
         referral_code = validated_data.pop("referral_code", None)
-        if referral_code:
-            referral_user = User.objects.get(invite_code=referral_code)
-            instance.referrals = referral_user
-            instance.referral_code = referral_code
-
-        return super().update(instance, validated_data)
+        avatar_changed = "avatar" in validated_data
+        stale_thumbnails = list((instance.avatar_thumbnails or {}).values())
+        if avatar_changed:
+            # миниатюры прежнего аватара удаляются, новые создаются в фоне
+            validated_data["avatar_thumbnails"] = {}
+
+        with transaction.atomic():
+            if referral_code:
+                try:
+                    apply_referral_code(instance, referral_code)
+                except InviteCodeError as exc:
+                    raise serializers.ValidationError({"referral_code": [str(exc)]})
+
+            # сохраняются только переданные поля, чтобы не затереть referrals
+            for attr, value in validated_data.items():
+                setattr(instance, attr, value)
+            if validated_data:
+                instance.save(update_fields=list(validated_data))
+            if avatar_changed:
+                schedule_avatar_processing(instance, stale_thumbnails)
+
+        return instance
+
+
+class UserReferralSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = User
+        fields = ("phone", "city", "telegram_id", "email")
 
 
 class UserStaffSerializer(serializers.ModelSerializer):
     class Meta:
         model = User
         fields = ("id", "phone", "is_active", "is_staff", "is_superuser")
+
+
+class UserListFilterSerializer(serializers.Serializer):
+    is_active = serializers.BooleanField(required=False)
+    is_staff = serializers.BooleanField(required=False)
+    city = serializers.CharField(required=False)
+
+
+class UserExportSerializer(UserListFilterSerializer):
+    file_format = serializers.ChoiceField(
+        choices=tuple(USER_EXPORT_FORMATS), required=False
+    )
+
+
+class UserImportSerializer(serializers.Serializer):
+    file_format = serializers.ChoiceField(
+        choices=tuple(USER_EXPORT_FORMATS), default="ndjson"
+    )
+
+
+class UserImportJobSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = UserImport
+        fields = (
+            "id",
+            "status",
+            "file_format",
+            "inserted",
+            "skipped",
+            "error",
+            "created_at",
+            "finished_at",
+        )
+        read_only_fields = fields
+
+
+class UserTokenObtainPairSerializer(TokenObtainPairSerializer):
+    token_class = UserRefreshToken
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields[self.username_field] = PhoneNumberField(write_only=True)
+
+
+class UserTokenRefreshSerializer(TokenRefreshSerializer):
+    """Обновление токена с признаками пользователя из БД.
+
+    Признаки не копируются из refresh токена, иначе отключенный или лишенный
+    прав пользователь сохранял бы их в access токенах до истечения refresh токена.
+    """
+
+    token_class = UserRefreshToken
+
+    def validate(self, attrs):
+        refresh = self.token_class(attrs["refresh"])
+        if is_revoked(refresh):
+            raise InvalidToken("Токен отозван.", code="token_revoked")
+
+        user = (
+            User.objects.filter(
+                **{api_settings.USER_ID_FIELD: refresh.get(api_settings.USER_ID_CLAIM)}
+            )
+            .only(*USER_TOKEN_CLAIMS)
+            .first()
+        )
+        if user is None or not api_settings.USER_AUTHENTICATION_RULE(user):
+            raise AuthenticationFailed(
+                self.error_messages["no_active_account"], "no_active_account"
+            )
+        for claim in USER_TOKEN_CLAIMS:
+            refresh[claim] = getattr(user, claim)
+
+        data = {"access": str(refresh.access_token)}
+        if api_settings.ROTATE_REFRESH_TOKENS:
+            refresh.set_jti()
+            refresh.set_exp()
+            refresh.set_iat()
+            data["refresh"] = str(refresh)
+        return data
+
+
+class UserLogoutSerializer(serializers.Serializer):
+    refresh = serializers.CharField(write_only=True)
+
+    def validate_refresh(self, value):
+        try:
+            token = UserRefreshToken(value)
+        except TokenError as exc:
+            raise serializers.ValidationError(str(exc))
+        user_id = token.get(api_settings.USER_ID_CLAIM)
+        if str(user_id) != str(self.context["request"].user.pk):
+            raise serializers.ValidationError("Токен выдан другому пользователю.")
+        return token
@@ -1,18 +1,497 @@
-import random
+import codecs
+import csv
+import functools
+import io
+import itertools
+import json
+import secrets
+import string
+
+from django.conf import settings
+from django.contrib.auth.hashers import UNUSABLE_PASSWORD_PREFIX, make_password
+from django.core.files import File
+from django.db import IntegrityError, connection, transaction
+from django.db.models import F
+from django.db.models.constants import OnConflict
+from django.utils.timezone import now
+
+from users.models import AuthCode, InviteCode, User, UserImport
+from users.phones import normalize_phone_or_none
+from users.profile_cache import invalidate_profile
+from users.workers import submit_on_commit
+
+# столбцы, заполняемые импортом для каждой строки, остальные - значения по умолчанию
+IMPORT_COLUMNS = ("phone", "invite_code", "password")
+IMPORT_STAGING_TABLE = "users_user_import_staging"
+
+INVITE_CODE_ALPHABET = string.digits + string.ascii_letters
+INVITE_CODE_LENGTH = 6
+INVITE_CODE_SPACE = len(INVITE_CODE_ALPHABET) ** INVITE_CODE_LENGTH
+_INVITE_CODE_TABLE = bytes(
+    ord(INVITE_CODE_ALPHABET[byte % len(INVITE_CODE_ALPHABET)]) for byte in range(256)
+)
+_INVITE_CODE_REJECTED_BYTES = bytes(range(256 - 256 % len(INVITE_CODE_ALPHABET), 256))
+
+# пароль пользователей, входящих по коду авторизации, без хеширования
+unusable_password = functools.partial(make_password, None)
+
+
+def fast_unusable_passwords(count):
+    """Непригодные для входа пароли без get_random_string, для массового создания"""
+    random = secrets.token_hex(20 * count)
+    return [
+        UNUSABLE_PASSWORD_PREFIX + random[i : i + 40] for i in range(0, 40 * count, 40)
+    ]
 
 
 def generate_auth_code():
     """Функция для генерирования кода авторизации"""
-    auth_code = "".join([random.choice(list("0123456789")) for i in range(4)])
+    auth_code = f"{secrets.randbelow(10**4):04d}"
     return auth_code
 
 
 def generate_invite_code():
     """Функция для генерирования Invite кода"""
-    str1 = "0123456789"
-    str2 = "qwertyuiopasdfghjklzxcvbnm"
-    str3 = str2.upper()
-    rand_list = list(str1 + str2 + str3)
-    random.shuffle(rand_list)
-    invite_code = "".join([random.choice(rand_list) for i in range(6)])
-    return invite_code
+    number = secrets.randbelow(INVITE_CODE_SPACE)
+    chars = []
+    for _ in range(INVITE_CODE_LENGTH):
+        number, index = divmod(number, len(INVITE_CODE_ALPHABET))
+        chars.append(INVITE_CODE_ALPHABET[index])
+    return "".join(chars)
+
+
+def pop_invite_code():
+    """Забирает код из пула зарезервированных Invite кодов, None если пул пуст"""
+    with transaction.atomic():
+        queryset = InviteCode.objects.order_by("pk")
+        if connection.features.has_select_for_update_skip_locked:
+            queryset = queryset.select_for_update(skip_locked=True)
+        invite_code = queryset.first()
+        if invite_code is None:
+            return None
+        invite_code.delete()
+    return invite_code.code
+
+
+def allocate_invite_code():
+    """Выдает Invite код для нового пользователя"""
+    if settings.INVITE_CODE_POOL_ENABLED:
+        code = pop_invite_code()
+        if code:
+            return code
+    return generate_invite_code()
+
+
+class _InviteCodeAllocator:
+    """Выделяет Invite коды для get_or_create и запоминает последний выданный"""
+
+    last_code = None
+
+    def __call__(self):
+        self.last_code = allocate_invite_code()
+        return self.last_code
+
+
+def get_or_create_user(phone):
+    """Получение или создание пользователя с повтором при совпадении Invite кода"""
+    allocator = _InviteCodeAllocator()
+    for attempt in range(settings.INVITE_CODE_MAX_ATTEMPTS):
+        try:
+            # код выделяется только при создании пользователя
+            return User.objects.get_or_create(
+                phone=phone,
+                defaults={"invite_code": allocator, "password": unusable_password},
+            )
+        except IntegrityError:
+            if attempt == settings.INVITE_CODE_MAX_ATTEMPTS - 1:
+                raise
+            # код из пула вернулся в него при откате, но уже занят
+            InviteCode.objects.filter(code=allocator.last_code).delete()
+
+
+async def aget_or_create_user(phone):
+    """Асинхронная версия get_or_create_user"""
+    allocator = _InviteCodeAllocator()
+    for attempt in range(settings.INVITE_CODE_MAX_ATTEMPTS):
+        try:
+            return await User.objects.aget_or_create(
+                phone=phone,
+                defaults={"invite_code": allocator, "password": unusable_password},
+            )
+        except IntegrityError:
+            if attempt == settings.INVITE_CODE_MAX_ATTEMPTS - 1:
+                raise
+            await InviteCode.objects.filter(code=allocator.last_code).adelete()
+
+
+class InviteCodeError(Exception):
+    """Ошибка применения Invite кода"""
+
+
+def apply_referral_code(user, invite_code):
+    """Применяет чужой Invite код, возвращает пригласившего пользователя.
+
+    Повторное применение исключается условным UPDATE ... WHERE referrals_id IS NULL,
+    поэтому конкурирующие запросы не могут применить код дважды.
+    """
+    inviter = User.objects.filter(invite_code=invite_code).only("pk").first()
+    if inviter is None:
+        raise InviteCodeError("Неверный invite-код.")
+    if inviter.pk == user.pk:
+        raise InviteCodeError("Нельзя использовать собственный invite-код.")
+
+    updated = User.objects.filter(pk=user.pk, referrals__isnull=True).update(
+        referrals=inviter, referral_code=invite_code
+    )
+    if not updated:
+        raise InviteCodeError("Вы уже использовали invite-код.")
+    User.objects.filter(pk=inviter.pk).update(referral_count=F("referral_count") + 1)
+
+    user.referrals = inviter
+    user.referral_code = invite_code
+    # update() не отправляет post_save
+    invalidate_profile(user.pk, inviter.pk)
+    return inviter
+
+
+def soft_delete_user(user):
+    """Помечает пользователя удаленным, не затрагивая связанные строки.
+
+    Номер телефона освобождается для повторной регистрации, счетчик рефералов
+    пригласившего уменьшается сразу. Ссылки рефералов и коды авторизации
+    удаляет purge_deleted_user.
+    """
+    with transaction.atomic():
+        User.all_objects.filter(pk=user.pk).update(
+            deleted_at=now(), is_active=False, phone=f"deleted-{user.pk}"
+        )
+        if user.referrals_id:
+            User.objects.filter(pk=user.referrals_id, referral_count__gt=0).update(
+                referral_count=F("referral_count") - 1
+            )
+    # update() не отправляет post_save
+    invalidate_profile(user.pk, user.referrals_id)
+
+
+def _delete_in_batches(queryset, batch_size):
+    deleted = 0
+    while pks := list(queryset.values_list("pk", flat=True)[:batch_size]):
+        deleted += queryset.filter(pk__in=pks).delete()[0]
+    return deleted
+
+
+def purge_deleted_user(pk, batch_size=1000):
+    """Удаляет строку помеченного удаленным пользователя, возвращает True при удалении.
+
+    Ссылки рефералов обнуляются и коды авторизации удаляются пачками по
+    batch_size строк, каждая пачка в своей короткой транзакции, поэтому
+    итоговое удаление пользователя не каскадирует по большим таблицам.
+    """
+    if not User.all_objects.filter(pk=pk, deleted_at__isnull=False).exists():
+        return False
+
+    referrals = User.all_objects.filter(referrals_id=pk)
+    while pks := list(referrals.values_list("pk", flat=True)[:batch_size]):
+        User.all_objects.filter(pk__in=pks).update(referrals=None)
+        invalidate_profile(*pks)
+    _delete_in_batches(AuthCode.objects.filter(user_id=pk), batch_size)
+    User.all_objects.filter(pk=pk, deleted_at__isnull=False).delete()
+    return True
+
+
+def purge_deleted_users(batch_size=1000):
+    """Удаляет строки всех помеченных удаленными пользователей, возвращает их число"""
+    purged = 0
+    deleted = User.all_objects.filter(deleted_at__isnull=False).order_by("pk")
+    while pks := list(deleted.values_list("pk", flat=True)[:batch_size]):
+        purged += sum(purge_deleted_user(pk, batch_size) for pk in pks)
+        deleted = deleted.filter(pk__gt=pks[-1])
+    return purged
+
+
+def refill_invite_code_pool(size, batch_size=1000):
+    """Пополняет пул Invite кодов до заданного размера, возвращает число добавленных"""
+    initial = current = InviteCode.objects.count()
+    while current < size:
+        candidates = {
+            generate_invite_code() for _ in range(min(size - current, batch_size))
+        }
+        candidates -= set(
+            User.all_objects.filter(invite_code__in=candidates).values_list(
+                "invite_code", flat=True
+            )
+        )
+        InviteCode.objects.bulk_create(
+            (InviteCode(code=code) for code in candidates), ignore_conflicts=True
+        )
+        current = InviteCode.objects.count()
+    return current - initial
+
+
+USER_EXPORT_FIELDS = (
+    "id",
+    "phone",
+    "email",
+    "city",
+    "telegram_id",
+    "invite_code",
+    "is_active",
+    "is_staff",
+    "is_superuser",
+    "date_joined",
+)
+USER_EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv",
+}
+
+
+def _iter_user_rows(queryset, chunk_size):
+    rows = queryset.order_by("pk").values_list(*USER_EXPORT_FIELDS)
+    batch = []
+    for row in rows.iterator(chunk_size=chunk_size):
+        batch.append(row)
+        if len(batch) == chunk_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def iter_users_export(queryset, file_format, chunk_size=2000):
+    """Генератор выгрузки пользователей в формате NDJSON или CSV по частям"""
+    if file_format == "csv":
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        writer.writerow(USER_EXPORT_FIELDS)
+        yield buffer.getvalue()
+        for batch in _iter_user_rows(queryset, chunk_size):
+            buffer.seek(0)
+            buffer.truncate()
+            writer.writerows(batch)
+            yield buffer.getvalue()
+    else:
+        for batch in _iter_user_rows(queryset, chunk_size):
+            yield "".join(
+                json.dumps(dict(zip(USER_EXPORT_FIELDS, row)), default=str) + "\n"
+                for row in batch
+            )
+
+
+def iter_import_phones(lines, file_format):
+    """Генератор номеров из строк CSV (столбец phone) или NDJSON ({"phone": ...})"""
+    if file_format == "csv":
+        for row in csv.DictReader(lines):
+            yield row.get("phone") or ""
+    else:
+        for line in lines:
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError:
+                yield ""
+                continue
+            yield row.get("phone", "") if isinstance(row, dict) else ""
+
+
+def _generate_invite_codes(count):
+    """Пачка различных Invite кодов, совпадения с существующими исключает вставка.
+
+    Символы получаются из случайных байтов через таблицу перекодировки, байты
+    из неполного последнего отрезка отбрасываются, чтобы символы были равновероятны.
+    """
+    codes = set()
+    while len(codes) < count:
+        missing = count - len(codes)
+        chars = (
+            secrets.token_bytes(missing * INVITE_CODE_LENGTH * 2)
+            .translate(_INVITE_CODE_TABLE, _INVITE_CODE_REJECTED_BYTES)
+            .decode()
+        )
+        size = min(len(chars) // INVITE_CODE_LENGTH, missing) * INVITE_CODE_LENGTH
+        codes.update(
+            chars[i : i + INVITE_CODE_LENGTH]
+            for i in range(0, size, INVITE_CODE_LENGTH)
+        )
+    return list(codes)
+
+
+def _import_defaults():
+    """Остальные столбцы users_user и их значения по умолчанию.
+
+    Значения готовятся так же, как в bulk_create, один раз на пачку.
+    """
+    user = User()
+    fields = [
+        field
+        for field in User._meta.concrete_fields
+        if not field.primary_key and field.attname not in IMPORT_COLUMNS
+    ]
+    defaults = [
+        field.get_db_prep_save(field.pre_save(user, True), connection)
+        for field in fields
+    ]
+    return fields, defaults
+
+
+def _copy_rows(cursor, sql, rows):
+    """COPY ... FROM STDIN для psycopg 3 и psycopg2"""
+    from django.db.backends.postgresql.psycopg_any import is_psycopg3
+
+    if is_psycopg3:
+        with cursor.copy(sql) as copy:
+            for row in rows:
+                copy.write_row(row)
+    else:
+        # номера, коды и пароли не содержат табуляций, переводов строк и обратных косых
+        data = io.StringIO("".join("\t".join(row) + "\n" for row in rows))
+        cursor.copy_expert(sql, data)
+
+
+def _copy_users(rows, fields, defaults):
+    """Postgres: COPY во временную таблицу и INSERT ... ON CONFLICT DO NOTHING"""
+    quote_name = connection.ops.quote_name
+    staging = quote_name(IMPORT_STAGING_TABLE)
+    imported = ", ".join(IMPORT_COLUMNS)
+    staging_columns = ", ".join(
+        f"{name} {User._meta.get_field(name).db_type(connection)}"
+        for name in IMPORT_COLUMNS
+    )
+    columns = ", ".join(quote_name(field.column) for field in fields)
+    # NULL и другие значения без типа приводятся к типам столбцов явно
+    casts = ", ".join(f"CAST(%s AS {field.db_type(connection)})" for field in fields)
+    with connection.cursor() as cursor:
+        cursor.execute(
+            f"CREATE TEMPORARY TABLE {staging} ({staging_columns}) ON COMMIT DROP"
+        )
+        _copy_rows(cursor.cursor, f"COPY {staging} ({imported}) FROM STDIN", rows)
+        cursor.execute(
+            f"INSERT INTO {quote_name(User._meta.db_table)} ({imported}, {columns}) "
+            f"SELECT {imported}, {casts} FROM {staging} "
+            "ON CONFLICT DO NOTHING RETURNING phone",
+            defaults,
+        )
+        inserted = {phone for (phone,) in cursor.fetchall()}
+        # внутри внешней транзакции ON COMMIT DROP не срабатывает до ее фиксации
+        cursor.execute(f"DROP TABLE {staging}")
+    return inserted
+
+
+def _executemany_users(rows, fields, defaults):
+    """Остальные СУБД: INSERT с пропуском конфликтов одним executemany"""
+    quote_name = connection.ops.quote_name
+    columns = IMPORT_COLUMNS + tuple(quote_name(field.column) for field in fields)
+    sql = "{} {} ({}) VALUES ({}) {}".format(
+        connection.ops.insert_statement(on_conflict=OnConflict.IGNORE),
+        quote_name(User._meta.db_table),
+        ", ".join(columns),
+        ", ".join(["%s"] * len(columns)),
+        connection.ops.on_conflict_suffix_sql(fields, OnConflict.IGNORE, None, None),
+    )
+    defaults = tuple(defaults)
+    with connection.cursor() as cursor:
+        cursor.executemany(sql, [row + defaults for row in rows])
+
+
+def _insert_users(values):
+    """Добавляет пользователей, возвращает добавленные номера.
+
+    values - словарь {phone: invite_code}. Строки, нарушающие уникальность,
+    пропускаются (ON CONFLICT DO NOTHING). На Postgres строки загружаются
+    через COPY и добавленные номера возвращает RETURNING, на остальных СУБД
+    они определяются повторным запросом по паре номер и Invite код.
+    """
+    fields, defaults = _import_defaults()
+    rows = list(zip(values, values.values(), fast_unusable_passwords(len(values))))
+    with transaction.atomic():
+        if connection.vendor == "postgresql":
+            return _copy_users(rows, fields, defaults)
+        _executemany_users(rows, fields, defaults)
+    rows = User.objects.filter(phone__in=values).values_list("phone", "invite_code")
+    return {phone for phone, invite_code in rows if values[phone] == invite_code}
+
+
+def _import_batch(phones):
+    """Создает пользователей пачкой, возвращает число добавленных"""
+    pending = set(phones)
+    if connection.vendor != "postgresql":
+        # без RETURNING добавленные строки определяются по Invite коду,
+        # поэтому зарегистрированные номера исключаются до вставки
+        pending -= set(
+            User.objects.filter(phone__in=phones).values_list("phone", flat=True)
+        )
+    inserted = 0
+    for _ in range(settings.INVITE_CODE_MAX_ATTEMPTS):
+        if not pending:
+            break
+        values = dict(zip(pending, _generate_invite_codes(len(pending))))
+        created = _insert_users(values)
+        inserted += len(created)
+        pending -= created
+        if pending:
+            # остальные номера зарегистрированы параллельно или их Invite код
+            # занят: первые пропускаются, вторые повторяются с новыми кодами
+            pending -= set(
+                User.objects.filter(phone__in=pending).values_list("phone", flat=True)
+            )
+    return inserted
+
+
+def import_users(phones, batch_size=5000, progress=None):
+    """Массово создает пользователей по номерам, возвращает (добавлено, пропущено).
+
+    Номера приводятся к формату E.164, некорректные номера, повторы
+    и уже зарегистрированные номера пропускаются. progress вызывается
+    с промежуточными (добавлено, пропущено) после каждой пачки.
+    """
+    inserted = skipped = 0
+    phones = iter(phones)
+    while batch := list(itertools.islice(phones, batch_size)):
+        unique = [
+            phone
+            for phone in dict.fromkeys(map(normalize_phone_or_none, batch))
+            if phone
+        ]
+        added = _import_batch(unique) if unique else 0
+        inserted += added
+        skipped += len(batch) - added
+        if progress:
+            progress(inserted, skipped)
+    return inserted, skipped
+
+
+def start_user_import(stream, file_format, user_id=None):
+    """Сохраняет файл и ставит импорт в пул фоновых потоков после фиксации транзакции"""
+    job = UserImport(file_format=file_format, created_by_id=user_id)
+    job.file.save(f"users.{file_format}", File(stream or io.BytesIO()), save=False)
+    job.save()
+    submit_on_commit(run_user_import, job.pk)
+    return job
+
+
+def run_user_import(pk):
+    """Импортирует пользователей из сохраненного файла и удаляет его.
+
+    Счетчики задачи обновляются после каждой пачки, поэтому при ошибке
+    видно, сколько номеров уже добавлено.
+    """
+    job = UserImport.objects.get(pk=pk)
+    jobs = UserImport.objects.filter(pk=pk)
+    jobs.update(status=UserImport.STATUS_RUNNING)
+
+    def progress(inserted, skipped):
+        jobs.update(inserted=inserted, skipped=skipped)
+
+    result = {"status": UserImport.STATUS_DONE}
+    try:
+        with job.file.open("rb") as file:
+            lines = codecs.iterdecode(file, "utf-8")
+            import_users(iter_import_phones(lines, job.file_format), progress=progress)
+    except Exception as exc:
+        result = {"status": UserImport.STATUS_FAILED, "error": str(exc)}
+        if not isinstance(exc, (UnicodeDecodeError, csv.Error)):
+            raise
+    finally:
+        job.file.delete(save=False)
+        jobs.update(file=None, finished_at=now(), **result)
@@ -0,0 +1,23 @@
+from django.db.models import F
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from users.models import User
+from users.profile_cache import invalidate_profile
+
+
+@receiver(post_save, sender=User)
+@receiver(post_delete, sender=User)
+def invalidate_user_profile(sender, instance, **kwargs):
+    """Сброс кеша профиля пользователя и пригласившего его пользователя"""
+    invalidate_profile(instance.pk, instance.referrals_id)
+
+
+@receiver(post_delete, sender=User)
+def decrement_referral_count(sender, instance, **kwargs):
+    """Уменьшение счетчика рефералов пригласившего пользователя"""
+    # при мягком удалении счетчик уже уменьшен
+    if instance.referrals_id and instance.deleted_at is None:
+        User.objects.filter(pk=instance.referrals_id, referral_count__gt=0).update(
+            referral_count=F("referral_count") - 1
+        )
@@ -0,0 +1,110 @@
+from django.conf import settings
+from django.core.cache import caches
+from rest_framework.settings import api_settings
+from rest_framework.throttling import SimpleRateThrottle
+
+from users.phones import normalize_phone_or_none
+
+
+class SlidingWindowRateThrottle(SimpleRateThrottle):
+    """Ограничение частоты запросов скользящим окном на счетчиках в кеше.
+
+    Число запросов за последние duration секунд оценивается по счетчикам
+    текущего и предыдущего окна: previous * (1 - elapsed) + current.
+    Счетчики увеличиваются атомарно через cache.incr(), поэтому ограничение
+    соблюдается для нескольких процессов с общим кешем.
+    """
+
+    @property
+    def cache(self):
+        return caches[settings.THROTTLE_CACHE]
+
+    def get_rate(self):
+        # api_settings перечитывается при override_settings, в отличие от THROTTLE_RATES
+        return api_settings.DEFAULT_THROTTLE_RATES.get(self.scope)
+
+    def get_key(self, request, data):
+        """Ключ счетчика по запросу и его данным, None - запрос не ограничивается"""
+        raise NotImplementedError
+
+    def get_cache_key(self, request, view):
+        # представление может учитывать запросы в счетчике другого метода
+        self.action = getattr(view, "throttle_action", request.method)
+        return self.get_key(request, request.data)
+
+    def _windows(self):
+        now = self.timer()
+        index, offset = divmod(now, self.duration)
+        self.elapsed = offset / self.duration
+        return f"{self.key}:{int(index)}", f"{self.key}:{int(index) - 1}"
+
+    def _estimate(self, current, previous):
+        self.current, self.previous = current, previous or 0
+        return self.previous * (1 - self.elapsed) + self.current <= self.num_requests
+
+    def allow_request(self, request, view):
+        if self.rate is None:
+            return True
+        self.key = self.get_cache_key(request, view)
+        if self.key is None:
+            return True
+
+        current_key, previous_key = self._windows()
+        self.cache.add(current_key, 0, self.duration * 2)
+        try:
+            current = self.cache.incr(current_key)
+        except ValueError:  # счетчик вытеснен из кеша
+            self.cache.set(current_key, current := 1, self.duration * 2)
+        return self._estimate(current, self.cache.get(previous_key))
+
+    async def aallow_request(self, request, data):
+        """Асинхронная проверка для представлений вне DRF"""
+        if self.rate is None:
+            return True
+        self.action = request.method
+        self.key = self.get_key(request, data)
+        if self.key is None:
+            return True
+
+        current_key, previous_key = self._windows()
+        await self.cache.aadd(current_key, 0, self.duration * 2)
+        try:
+            current = await self.cache.aincr(current_key)
+        except ValueError:
+            await self.cache.aset(current_key, current := 1, self.duration * 2)
+        return self._estimate(current, await self.cache.aget(previous_key))
+
+    def wait(self):
+        """Время до снижения оценки ниже лимита, если новых запросов не будет"""
+        remaining = (1 - self.elapsed) * self.duration
+        allowed = self.num_requests - 1
+        if self.current <= allowed and self.previous:
+            # лимит освободится еще в текущем окне
+            elapsed = 1 - (allowed - self.current) / self.previous
+            return max((elapsed - self.elapsed) * self.duration, 0)
+        return remaining + max(1 - allowed / self.current, 0) * self.duration
+
+
+class LoginIPRateThrottle(SlidingWindowRateThrottle):
+    """Ограничение запросов авторизации с одного IP адреса"""
+
+    scope = "login_ip"
+
+    def get_key(self, request, data):
+        ident = f"{self.action}:{self.get_ident(request)}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
+
+
+class LoginPhoneRateThrottle(SlidingWindowRateThrottle):
+    """Ограничение запросов авторизации для одного номера телефона"""
+
+    scope = "login_phone"
+
+    def get_key(self, request, data):
+        phone = data.get("phone") if hasattr(data, "get") else None
+        if not phone:
+            return None
+        # разные записи одного номера учитываются одним счетчиком
+        phone = normalize_phone_or_none(phone) or str(phone).strip()
+        ident = f"{self.action}:{phone}"
+        return self.cache_format % {"scope": self.scope, "ident": ident}
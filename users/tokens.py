@@ -0,0 +1,15 @@
+from rest_framework_simplejwt.tokens import RefreshToken
+
+# Поля пользователя, которые записываются в токен при выдаче
+USER_TOKEN_CLAIMS = ("is_active", "is_staff", "is_superuser")
+
+
+class UserRefreshToken(RefreshToken):
+    """Refresh токен с признаками пользователя для проверки прав без обращения к БД"""
+
+    @classmethod
+    def for_user(cls, user):
+        token = super().for_user(user)
+        for claim in USER_TOKEN_CLAIMS:
+            token[claim] = getattr(user, claim)
+        return token
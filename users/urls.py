@@ -1,21 +1,46 @@
 from django.urls import path
-from rest_framework_simplejwt.views import TokenObtainPairView, TokenRefreshView
+from rest_framework_simplejwt.views import TokenRefreshView
 
 from users.apps import UsersConfig
-from users.views import UserAuthAPIView, UserListAPIView, UserProfileUpdateDeleteAPIView
+from users.views import (
+    AsyncUserAuthView,
+    UserAuthAPIView,
+    UserExportAPIView,
+    UserImportAPIView,
+    UserImportStatusAPIView,
+    UserListAPIView,
+    UserLogoutAPIView,
+    UserProfileUpdateDeleteAPIView,
+    UserReferralListAPIView,
+    UserTokenObtainPairView,
+)
 
 app_name = UsersConfig.name
 
 
 urlpatterns = [
     path("login/", UserAuthAPIView.as_view(), name="login_user"),
+    path("logout/", UserLogoutAPIView.as_view(), name="logout_user"),
+    path("async/login/", AsyncUserAuthView.as_view(), name="async_login_user"),
     path(
         "<int:pk>/",
         UserProfileUpdateDeleteAPIView.as_view(),
         name="user_profile_update_delete",
     ),
+    path(
+        "<int:pk>/referrals/",
+        UserReferralListAPIView.as_view(),
+        name="user_referrals",
+    ),
     path("list/", UserListAPIView.as_view(), name="all_users_for_staff"),
+    path("export/", UserExportAPIView.as_view(), name="export_users_for_staff"),
+    path("import/", UserImportAPIView.as_view(), name="import_users_for_staff"),
+    path(
+        "import/<int:pk>/",
+        UserImportStatusAPIView.as_view(),
+        name="import_status_for_staff",
+    ),
     # JWT
-    path("token/", TokenObtainPairView.as_view(), name="token_obtain_pair"),
+    path("token/", UserTokenObtainPairView.as_view(), name="token_obtain_pair"),
     path("token/refresh/", TokenRefreshView.as_view(), name="token_refresh"),
 ]
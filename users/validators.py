@@ -1,15 +1,18 @@
-from rest_framework import serializers
+from django.core.exceptions import ValidationError
+from django.utils.deconstruct import deconstructible
 
+from users.phones import PhoneNumberError, normalize_phone
 
+
+@deconstructible
 class PhoneNumberValidator:
-    """Валидация заполнения поля для номера телефона"""
+    """Валидация номера телефона: разбор номера и проверка кода страны"""
 
     def __call__(self, value):
-        phone = value.get("phone")
-        if not phone:
-            raise serializers.ValidationError("Номер телефона не может быть пуст.")
-        else:
-            if not phone.startswith("+7"):
-                raise serializers.ValidationError(
-                    "Номер телефона должен начинаться с +7..."
-                )
+        try:
+            normalize_phone(value)
+        except PhoneNumberError as exc:
+            raise ValidationError(str(exc), code="invalid_phone")
+
+    def __eq__(self, other):
+        return isinstance(other, PhoneNumberValidator)
@@ -1,27 +1,64 @@
-import time
+import json
 
+from django.db import transaction
+from django.http import JsonResponse, QueryDict, StreamingHttpResponse
+from django.utils.decorators import method_decorator
+from django.utils.http import parse_etags, quote_etag
+from django.views import View
+from django.views.decorators.csrf import csrf_exempt
 from drf_yasg.utils import swagger_auto_schema
 from rest_framework import generics, status
+from rest_framework.exceptions import Throttled
 from rest_framework.permissions import IsAuthenticated
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from rest_framework_simplejwt.tokens import RefreshToken
+from rest_framework_simplejwt.views import TokenObtainPairView
 
-from users.models import AuthCode, User
-from users.permissions import IsOwner, IsUserStaff
+from config.metrics import (
+    AUTH_CODE_VERIFY_FAILURES,
+    AUTH_CODES_ISSUED,
+    AUTH_CODES_VERIFIED,
+)
+from users.code_store import get_code_store
+from users.delivery import asend_auth_code, send_auth_code
+from users.models import User, UserImport
+from users.paginators import UserCursorPagination
+from users.permissions import IsOwner, IsStaffOrSuperuser, IsUserStaff
+from users.profile_cache import get_profile, get_profile_etag, set_profile
+from users.revocation import revoke_token, revoke_user_tokens
 from users.serializers import (
+    UserExportSerializer,
+    UserImportJobSerializer,
+    UserImportSerializer,
+    UserListFilterSerializer,
+    UserLogoutSerializer,
     UserProfileSerializer,
+    UserReferralSerializer,
     UserRegistrationSerializer,
     UserStaffSerializer,
     UserVerifySerializer,
 )
-from users.services import generate_auth_code, generate_invite_code
+from users.services import (
+    USER_EXPORT_FORMATS,
+    aget_or_create_user,
+    generate_auth_code,
+    get_or_create_user,
+    iter_users_export,
+    purge_deleted_user,
+    soft_delete_user,
+    start_user_import,
+)
+from users.throttling import LoginIPRateThrottle, LoginPhoneRateThrottle
+from users.tokens import UserRefreshToken
+from users.workers import submit_on_commit
 
 
 class UserAuthAPIView(APIView):
     """Представление для авторизации пользователя"""
 
     serializer_class = UserRegistrationSerializer
+    # проверяются до обработки запроса, отклоненные запросы не обращаются к БД
+    throttle_classes = [LoginIPRateThrottle, LoginPhoneRateThrottle]
 
     @swagger_auto_schema(request_body=UserRegistrationSerializer)
     def post(self, request, *args, **kwargs):
@@ -29,15 +66,13 @@ class UserAuthAPIView(APIView):
         serializer.is_valid(raise_exception=True)
 
         phone = serializer.validated_data["phone"]
-        user, created = User.objects.get_or_create(
-            phone=phone, defaults={"invite_code": generate_invite_code()}
-        )
+        user, created = get_or_create_user(phone)
 
         auth_code = generate_auth_code()
-        AuthCode.objects.create(user=user, code=auth_code)
-        print(f"Код авторизации для {phone}: {auth_code}")
+        get_code_store().issue(user, auth_code)
+        send_auth_code(phone, auth_code)
+        AUTH_CODES_ISSUED.inc()
 
-        time.sleep(2)
         return Response(
             {}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
         )
@@ -51,17 +86,16 @@ class UserAuthAPIView(APIView):
         phone = serializer.validated_data.get("phone")
         code = serializer.validated_data.get("auth_code")
 
-        auth_code_obj = AuthCode.objects.filter(user__phone=phone, code=code).last()
-        if not auth_code_obj:
+        user = get_code_store().verify(phone, code)
+        if user is None:
+            AUTH_CODE_VERIFY_FAILURES.inc()
             return Response(
                 {"message": "Доступ запрещен. Неверный код или номер телефона."},
                 status=status.HTTP_403_FORBIDDEN,
             )
 
-        user = auth_code_obj.user
-        auth_code_obj.delete()
-
-        refresh = RefreshToken.for_user(user)
+        AUTH_CODES_VERIFIED.inc()
+        refresh = UserRefreshToken.for_user(user)
         access_token = str(refresh.access_token)
 
         return Response(
@@ -74,6 +108,120 @@ class UserAuthAPIView(APIView):
         )
 
 
+def _get_request_data(request):
+    if request.content_type == "application/json":
+        try:
+            return json.loads(request.body or b"{}")
+        except ValueError:
+            return None
+    return QueryDict(request.body)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class AsyncUserAuthView(View):
+    """Асинхронное представление для авторизации пользователя (для запуска под ASGI)"""
+
+    http_method_names = ["post", "put"]
+    throttle_classes = [LoginIPRateThrottle, LoginPhoneRateThrottle]
+
+    async def check_throttles(self, request, data):
+        """Возвращает ответ 429, если превышена частота запросов"""
+        waits = []
+        for throttle_class in self.throttle_classes:
+            throttle = throttle_class()
+            if not await throttle.aallow_request(request, data or {}):
+                waits.append(throttle.wait())
+        if not waits:
+            return None
+        exc = Throttled(max(waits))
+        return JsonResponse(
+            {"detail": exc.detail},
+            status=exc.status_code,
+            headers={"Retry-After": str(exc.wait)},
+        )
+
+    async def post(self, request, *args, **kwargs):
+        data = _get_request_data(request)
+        if throttled := await self.check_throttles(request, data):
+            return throttled
+
+        serializer = UserRegistrationSerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        phone = serializer.validated_data["phone"]
+        user, created = await aget_or_create_user(phone)
+
+        auth_code = generate_auth_code()
+        await get_code_store().aissue(user, auth_code)
+        await asend_auth_code(phone, auth_code)
+        AUTH_CODES_ISSUED.inc()
+
+        return JsonResponse(
+            {}, status=status.HTTP_201_CREATED if created else status.HTTP_200_OK
+        )
+
+    async def put(self, request, *args, **kwargs):
+        """Метод для отправки на сервер полученного кода авторизации"""
+        data = _get_request_data(request)
+        if throttled := await self.check_throttles(request, data):
+            return throttled
+
+        serializer = UserVerifySerializer(data=data)
+        if not serializer.is_valid():
+            return JsonResponse(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
+
+        phone = serializer.validated_data.get("phone")
+        code = serializer.validated_data.get("auth_code")
+
+        user = await get_code_store().averify(phone, code)
+        if user is None:
+            AUTH_CODE_VERIFY_FAILURES.inc()
+            return JsonResponse(
+                {"message": "Доступ запрещен. Неверный код или номер телефона."},
+                status=status.HTTP_403_FORBIDDEN,
+            )
+
+        AUTH_CODES_VERIFIED.inc()
+        refresh = UserRefreshToken.for_user(user)
+        access_token = str(refresh.access_token)
+
+        return JsonResponse(
+            {
+                "message": "Доступ разрешен.",
+                "access_token": access_token,
+                "refresh_token": str(refresh),
+            },
+            status=status.HTTP_200_OK,
+        )
+
+
+class UserTokenObtainPairView(TokenObtainPairView):
+    """Выдача JWT токенов по коду авторизации или паролю"""
+
+    # проверка кода, поэтому счетчики общие с PUT login/
+    throttle_classes = [LoginIPRateThrottle, LoginPhoneRateThrottle]
+    throttle_action = "PUT"
+
+
+class UserLogoutAPIView(APIView):
+    """Представление для выхода: отзывает текущий access токен и переданный refresh"""
+
+    permission_classes = [IsAuthenticated]
+
+    @swagger_auto_schema(request_body=UserLogoutSerializer)
+    def post(self, request, *args, **kwargs):
+        serializer = UserLogoutSerializer(
+            data=request.data, context={"request": request}
+        )
+        serializer.is_valid(raise_exception=True)
+
+        with transaction.atomic():
+            revoke_token(serializer.validated_data["refresh"])
+            revoke_token(request.auth)
+        return Response(status=status.HTTP_204_NO_CONTENT)
+
+
 class UserProfileUpdateDeleteAPIView(generics.RetrieveUpdateDestroyAPIView):
     """Представление для получения и обновления профиля пользователя"""
 
@@ -81,10 +229,119 @@ class UserProfileUpdateDeleteAPIView(generics.RetrieveUpdateDestroyAPIView):
     queryset = User.objects.all()
     permission_classes = [IsAuthenticated, IsOwner | IsUserStaff]
 
+    def retrieve(self, request, *args, **kwargs):
+        pk = self.kwargs["pk"]
+
+        # права проверяются по pk, поэтому профиль из кеша отдается без запросов к БД
+        etag = get_profile_etag(pk)
+        if_none_match = parse_etags(request.headers.get("If-None-Match", ""))
+        if etag and (quote_etag(etag) in if_none_match or "*" in if_none_match):
+            self.check_object_permissions(request, User(pk=pk))
+            return Response(
+                status=status.HTTP_304_NOT_MODIFIED, headers={"ETag": quote_etag(etag)}
+            )
+
+        cached = get_profile(pk)
+        if cached:
+            self.check_object_permissions(request, User(pk=pk))
+            etag, data = cached
+        else:
+            instance = self.get_object()
+            data = self.get_serializer(instance).data
+            etag = set_profile(pk, data)
+
+        return Response(data, headers={"ETag": quote_etag(etag)})
+
+    def perform_destroy(self, instance):
+        # строка и связанные записи удаляются в фоне пачками
+        revoke_user_tokens(instance.pk)
+        soft_delete_user(instance)
+        submit_on_commit(purge_deleted_user, instance.pk)
+
+
+class UserReferralListAPIView(generics.ListAPIView):
+    """Представление для списка пользователей, которые ввели invite-код пользователя"""
+
+    serializer_class = UserReferralSerializer
+    permission_classes = [IsAuthenticated, IsOwner | IsUserStaff]
+    pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        if getattr(self, "swagger_fake_view", False):
+            return User.objects.none()
+        pk = self.kwargs["pk"]
+        self.check_object_permissions(self.request, User(pk=pk))
+        return User.objects.filter(referrals_id=pk).only(
+            "id", *UserReferralSerializer.Meta.fields
+        )
+
 
 class UserListAPIView(generics.ListAPIView):
     """Представление для отображения списка пользователей для модератора"""
 
     serializer_class = UserStaffSerializer
-    queryset = User.objects.all()
+    queryset = User.objects.only(*UserStaffSerializer.Meta.fields)
+    permission_classes = [IsAuthenticated, IsUserStaff]
+    pagination_class = UserCursorPagination
+
+    def get_queryset(self):
+        filters = UserListFilterSerializer(data=self.request.query_params, partial=True)
+        filters.is_valid(raise_exception=True)
+        return super().get_queryset().filter(**filters.validated_data)
+
+
+class UserExportAPIView(APIView):
+    """Представление для потоковой выгрузки пользователей модератором"""
+
     permission_classes = [IsAuthenticated, IsUserStaff]
+
+    def perform_content_negotiation(self, request, force=False):
+        # ответ формируется без рендереров DRF
+        return super().perform_content_negotiation(request, force=True)
+
+    @swagger_auto_schema(query_serializer=UserExportSerializer)
+    def get(self, request, *args, **kwargs):
+        serializer = UserExportSerializer(data=request.query_params, partial=True)
+        serializer.is_valid(raise_exception=True)
+        filters = dict(serializer.validated_data)
+        file_format = filters.pop("file_format", "ndjson")
+
+        response = StreamingHttpResponse(
+            iter_users_export(User.objects.filter(**filters), file_format),
+            content_type=USER_EXPORT_FORMATS[file_format],
+        )
+        response["Content-Disposition"] = f'attachment; filename="users.{file_format}"'
+        return response
+
+
+class UserImportAPIView(APIView):
+    """Представление для массового создания пользователей модератором.
+
+    Тело запроса - файл CSV со столбцом phone или NDJSON. Файл сохраняется,
+    импорт выполняется в фоне, статус доступен по адресу import/<id>/.
+    """
+
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+
+    @swagger_auto_schema(
+        query_serializer=UserImportSerializer,
+        responses={202: UserImportJobSerializer},
+    )
+    def post(self, request, *args, **kwargs):
+        serializer = UserImportSerializer(data=request.query_params)
+        serializer.is_valid(raise_exception=True)
+
+        job = start_user_import(
+            request.stream, serializer.validated_data["file_format"], request.user.pk
+        )
+        return Response(
+            UserImportJobSerializer(job).data, status=status.HTTP_202_ACCEPTED
+        )
+
+
+class UserImportStatusAPIView(generics.RetrieveAPIView):
+    """Представление для статуса фонового импорта пользователей"""
+
+    permission_classes = [IsAuthenticated, IsStaffOrSuperuser]
+    queryset = UserImport.objects.all()
+    serializer_class = UserImportJobSerializer
@@ -0,0 +1,47 @@
+import atexit
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.db import close_old_connections, transaction
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_lock = threading.Lock()
+
+
+def get_executor():
+    """Возвращает общий для процесса пул фоновых потоков"""
+    global _executor
+    if _executor is None:
+        with _lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(
+                    max_workers=settings.WORKER_POOL_SIZE,
+                    thread_name_prefix="users-worker",
+                )
+                atexit.register(_executor.shutdown, wait=True)
+    return _executor
+
+
+def _run(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        return func(*args, **kwargs)
+    except Exception:
+        logger.exception("Фоновая задача %r завершилась с ошибкой", func)
+        raise
+    finally:
+        close_old_connections()
+
+
+def submit(func, *args, **kwargs):
+    """Ставит задачу в пул фоновых потоков"""
+    return get_executor().submit(_run, func, *args, **kwargs)
+
+
+def submit_on_commit(func, *args, **kwargs):
+    """Ставит задачу в пул после фиксации текущей транзакции"""
+    transaction.on_commit(lambda: submit(func, *args, **kwargs))